@@ -5,6 +5,11 @@ import urllib.parse
 import requests
 import time
 import fitz
+from namecle_scan import scan_text
+from namecle_cache import LookupCache, SingleFlight, normalize_query
+from namecle_rename import RenamePlan
+from namecle_catalog import Catalog
+from namecle_metrics import REGISTRY as METRICS
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QPushButton,
     QListWidget, QFileDialog, QLabel, QMessageBox, QListWidgetItem,
@@ -26,6 +31,16 @@ GRADE_SSS_THRESHOLD = 1000
 GRADE_AAA_THRESHOLD = 100
 GRADE_BBB_THRESHOLD = 10
 
+APP_DATA_DIR = os.path.join(os.getenv("XDG_DATA_HOME") or os.path.expanduser("~/.local/share"), "Namecle")
+os.makedirs(APP_DATA_DIR, exist_ok=True)
+
+LOOKUP_CACHE = LookupCache(os.path.join(APP_DATA_DIR, "lookup_cache.json"))
+LOOKUP_FLIGHTS = SingleFlight()
+CATALOG = Catalog(os.path.join(APP_DATA_DIR, "catalog.db")) # 処理済み論文のカタログ
+LOOKUP_CACHE_REQUESTS = METRICS.counter("namecle_lookup_cache_requests_total", "検索キャッシュの参照回数", ["result"])
+LOOKUPS = METRICS.counter("namecle_lookups_total", "API 検索の回数（result: found / not_found / error）", ["source", "result"])
+LOOKUP_SECONDS = METRICS.histogram("namecle_lookup_seconds", "API 検索1回の所要時間", ["source"])
+
 def extract_pdf_info(pdf_path):
     """
     PDF の最初の5ページからテキストを抽出
@@ -40,13 +55,9 @@ def extract_pdf_info(pdf_path):
     for page in doc[:PDF_PREVIEW_PAGES]:
         text += page.get_text()
 
-    # DOI 抽出
-    doi_pattern = re.compile(
-        r'(?i)\b(?:https?://doi\.org/|doi[:\s]*)?(10\.\d{4,9}/[-._;()/:A-Z0-9]+)\b',
-        re.IGNORECASE
-    )
-    doi_match = doi_pattern.search(text)
-    doi = doi_match.group(1) if doi_match else None
+    # DOI・著者・発行年を1回の走査で抽出
+    doi, year, authors = scan_text(text, MAX_AUTHORS_TO_EXTRACT)
+    authors = ", ".join(authors)
 
     # タイトル抽出（フォントサイズなどを参考に）
     title = None
@@ -62,15 +73,6 @@ def extract_pdf_info(pdf_path):
         if title:
             break
 
-    # 著者抽出（簡易な正規表現）
-    author_pattern = re.compile(r'(?i)([A-Z]\.[A-Z]?\.?\s?[A-Z][a-z]+|[A-Z][a-z]+\s[A-Z][a-z]+)')
-    authors = author_pattern.findall(text)
-    authors = ", ".join(dict.fromkeys(authors[:MAX_AUTHORS_TO_EXTRACT]))
-
-    # 発行年抽出
-    year_match = re.findall(r'(20\d{2}|19\d{2})', text)
-    year = year_match[0] if year_match else None
-
     doc.close()
     return title, authors, year, doi, None
 
@@ -107,6 +109,8 @@ def search_semantic_scholar_by_doi(doi):
     try:
         time.sleep(1)
         response = requests.get(url, params=params)
+        if response.status_code == 404:
+            return None, None, None, "Semantic Scholar で DOI が見つかりませんでした。"
         if response.status_code != 200:
             return None, None, None, f"Semantic Scholar DOI API エラー: {response.status_code}"
         data = response.json()
@@ -160,6 +164,8 @@ def search_crossref_by_doi(doi):
     try:
         time.sleep(1)
         response = requests.get(url)
+        if response.status_code == 404:
+            return None, None, None, "CrossRef で DOI が見つかりませんでした。"
         if response.status_code != 200:
             return None, None, None, f"CrossRef DOI API エラー: {response.status_code}"
         message = response.json().get("message", {})
@@ -180,6 +186,28 @@ def search_crossref_by_doi(doi):
     except Exception as e:
         return None, None, None, f"CrossRef DOI API 呼び出し中にエラー: {e}"
 
+def cached_search(search_func, query, **key):
+    """検索結果をキャッシュ経由で取得する（API エラーはキャッシュしない）"""
+    cache_key = f"{search_func.__name__}|{normalize_query(**key)}"
+    cached = LOOKUP_CACHE.get(cache_key)
+    if cached:
+        LOOKUP_CACHE_REQUESTS.labels("hit").inc()
+        return tuple(cached[1])
+    LOOKUP_CACHE_REQUESTS.labels("miss").inc()
+
+    def lookup():
+        with LOOKUP_SECONDS.labels(search_func.__name__).time():
+            result = search_func(query)
+        found = isinstance(result[3], dict)
+        not_found = "見つかりませんでした" in str(result[3])
+        LOOKUPS.labels(search_func.__name__, "found" if found else "not_found" if not_found else "error").inc()
+        if found or not_found:
+            LOOKUP_CACHE.put(cache_key, list(result), found)
+        return result
+
+    # 同じ検索が実行中であれば、その結果を共有する
+    return LOOKUP_FLIGHTS.do(cache_key, lookup)
+
 def determine_grade(citation_count):
     if citation_count is None:
         return "unknown"
@@ -224,22 +252,31 @@ def process_file(pdf_path, logger, manual_title=None):
     # 検索フェーズ
     if doi and not manual_title:
         logger("[検索] DOI検索を実行中...")
-        citation_count, api_year, api_authors, info = search_semantic_scholar_by_doi(doi)
+        provider = "semantic_scholar"
+        citation_count, api_year, api_authors, info = cached_search(search_semantic_scholar_by_doi, doi, doi=doi)
         if not isinstance(info, dict):
+            provider = "crossref"
             logger(f"[検索エラー] Semantic Scholar DOI: {info}")
             logger("[検索] CrossRef DOI 検索を実行中...")
-            citation_count, api_year, api_authors, info = search_crossref_by_doi(doi)
+            citation_count, api_year, api_authors, info = cached_search(search_crossref_by_doi, doi, doi=doi)
     else:
         if not title:
             err = "[スキップ] 題目が取得できなかったためスキップしました。"
             logger(err)
             return None, {"エラー": err}
         logger("[検索] タイトル検索を実行中...")
-        citation_count, api_year, api_authors, info = search_semantic_scholar(title)
+        provider = "semantic_scholar"
+        citation_count, api_year, api_authors, info = cached_search(search_semantic_scholar, title, title=title)
         if not isinstance(info, dict):
+            provider = "crossref"
             logger(f"[検索エラー] Semantic Scholar: {info}")
             logger("[検索] CrossRef 検索を実行中...")
-            citation_count, api_year, api_authors, info = search_crossref(title)
+            citation_count, api_year, api_authors, info = cached_search(search_crossref, title, title=title)
+
+    if not isinstance(info, dict):
+        err = f"[検索エラー] CrossRef: {info}"
+        logger(err)
+        return None, {"エラー": err}
 
     # 最終情報の決定
     final_year    = info.get("year")    or meta_year
@@ -299,14 +336,27 @@ def process_file(pdf_path, logger, manual_title=None):
     }
 
     try:
-        os.rename(pdf_path, os.path.join(os.path.dirname(pdf_path), new_filename))
+        # 同名ファイルがある場合は上書きせずに " (n)" を付ける
+        plan = RenamePlan()
+        entry = plan.apply_entry(plan.add(pdf_path, new_filename))
+        new_filename = os.path.basename(entry["dst"])
         logger(f"[ファイル操作] ファイル名を変更しました: {new_filename}")
-        return new_filename, info_dict
     except Exception as e:
         err = f"[ファイル操作エラー] ファイル名の変更に失敗しました: {e}"
         logger(err)
         return None, {"エラー": err}
 
+    try:
+        CATALOG.add(entry["dst"], {
+            "title": final_title, "authors": final_authors, "year": final_year,
+            "citation_count": info.get("citation_count"), "doi": doi,
+            "provider": provider if isinstance(info, dict) else None,
+            "グレード": grade if grade != "unknown" else None
+        }, entry.get("fp"), previous_path=pdf_path)
+    except Exception as e:
+        logger(f"[カタログ] 記録に失敗しました: {e}")
+    return new_filename, info_dict
+
 class FileItemWidget(QWidget):
     def __init__(self, file_path, max_label_width, remove_callback):
         super().__init__()
@@ -585,6 +635,7 @@ class MainWindow(QMainWindow):
 
             self.progress.setValue((idx + 1) * step)
 
+        LOOKUP_CACHE.flush()
         self.progress.setValue(100)
         self.log("全てのファイルの処理が完了しました。")
         self.adjust_table_columns()
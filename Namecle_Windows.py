@@ -1,33 +1,59 @@
+import time
+STARTUP_T0 = time.time() # 起動時間計測用（他のモジュールを読み込む前に記録）
 import sys
+if __name__ == "__main__" and sys.argv[1:2] == ["--namecle-sandbox"]:
+    # exe 版では PDF 解析の子プロセスも同じ exe で起動されるため、GUI のモジュールを読み込む前に子プロセスの処理へ移る
+    import namecle_sandbox
+    sys.exit(namecle_sandbox.main(sys.argv[2:]))
 import os
 import re
 import urllib.parse
-import requests
-import time
-import fitz
 import json
+import threading
+import importlib.util
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import difflib
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QPushButton, QFileDialog, 
     QListWidgetItem, QHBoxLayout, QStyle, QLabel, QMessageBox, 
-    QTableWidgetItem, QInputDialog, QHeaderView, QProgressBar, QTableWidget
+    QTableWidgetItem, QInputDialog, QHeaderView, QProgressBar, QTableWidget,
+    QDialog, QVBoxLayout, QDialogButtonBox, QLineEdit
 )
-from PyQt5 import uic
-from PyQt5.QtCore import Qt, QThread, pyqtSignal, QMutex, QWaitCondition, QBuffer, QIODevice
-from PyQt5.QtGui import QDragEnterEvent, QDropEvent, QBrush, QIcon, QImage, QPixmap
+from PyQt5.QtCore import Qt, QTimer, QThread, pyqtSignal, QMutex, QWaitCondition, QBuffer, QIODevice, QUrl
+from PyQt5.QtGui import QDragEnterEvent, QDropEvent, QBrush, QIcon, QImage, QPixmap, QDesktopServices
 import qtawesome as qta
 import base64
+from namecle_cache import LookupCache, SingleFlight, normalize_query, file_fingerprint
+from namecle_index import OfflineIndex
+from namecle_catalog import Catalog
+from namecle_meta import read_metadata, trusted as metadata_trusted, MIN_SCORE as METADATA_MIN_SCORE
+from namecle_pdf import ParsePool, ReadAhead, WINDOW_PER_WORKER as PARSE_WINDOW_PER_WORKER, DEFAULT_BUDGET, DEFAULT_OCR, DEFAULT_READ_AHEAD, open_pdf_guarded
+from namecle_scan import find_doi, find_arxiv_id, arxiv_id_from_filename, identifiers_from_filename, scan_text
+from namecle_arxiv import ArxivResolver
+from namecle_rename import RenamePlan, list_journals, new_journal_path, read_journal, rollback_journal
+import namecle_timing as timing
+from namecle_profiler import run_profiled, MODES as PROFILE_MODES
+from namecle_metrics import REGISTRY as METRICS, MetricsServer, DEFAULT_PORT as DEFAULT_METRICS_PORT, parse_port
+from namecle_ratelimit import AdaptiveLimiter, KeyRing
 
 def resource_path(relative_path):
     if hasattr(sys, '_MEIPASS'):
         return os.path.join(sys._MEIPASS, relative_path)
     return os.path.join(os.path.abspath("."), relative_path)
 
-try:
-    from llama_cpp import Llama
-    HAS_LLAMA = True
-except ImportError:
-    HAS_LLAMA = False
+# llama_cpp / requests / fitz は起動を遅くするため、使う直前（または起動後のバックグラウンド）に読み込む
+HAS_LLAMA = importlib.util.find_spec("llama_cpp") is not None
+
+def preload_modules():
+    """ウィンドウ表示後に、最初の処理で必要になるモジュールを裏で読み込んでおく"""
+    def _load():
+        for name in ("requests", "fitz"):
+            try:
+                importlib.import_module(name)
+            except ImportError:
+                pass
+    threading.Thread(target=_load, daemon=True).start()
 
 MODERN_STYLESHEET = """
 QMainWindow {
@@ -207,6 +233,8 @@ if not os.path.exists(APP_DATA_DIR):
     os.makedirs(APP_DATA_DIR)
 
 SETTINGS_FILE = os.path.join(APP_DATA_DIR, "settings.json")
+UNDO_DIR = os.path.join(APP_DATA_DIR, "undo")
+PROFILE_DIR = os.path.join(APP_DATA_DIR, "profiles")
 
 CONFIG = {
     "PDF_PREVIEW_PAGES": 5,
@@ -216,11 +244,116 @@ CONFIG = {
     "GRADE_THRESHOLDS": {"SSS": 1000, "AAA": 100, "BBB": 10},
     "MAX_FILENAME_LENGTH": 255,
     "MODEL_PATH": "gemma-2-2b-it-Q4_K_M.gguf",
-    "TITLE_SIMILARITY_THRESHOLD": 0.75
+    "TITLE_SIMILARITY_THRESHOLD": 0.75,
+    "SEMANTIC_SCHOLAR_API_URL": "https://api.semanticscholar.org/graph/v1/paper/",
+    "CROSSREF_API_URL": "https://api.crossref.org/works",
+    "ARXIV_API_URL": "http://export.arxiv.org/api/query",
+    "API_REQUEST_INTERVAL": 1.0, # API呼び出し前の待ち時間 (秒)
+    # 認証・識別情報（settings.json の "semantic_scholar_api_keys" / "crossref_mailto" で指定）
+    "SEMANTIC_SCHOLAR_API_KEYS": [],
+    "SEMANTIC_SCHOLAR_KEY_RPS": 1.0, # キー1つあたりの上限 (リクエスト/秒)
+    "CROSSREF_MAILTO": "",
+    "POLITE_REQUEST_INTERVAL": 0.1, # CrossRef の polite pool を使うときの待ち時間 (秒)
+    "LEAN_PAYLOADS": True, # API には必要な項目だけを要求する（CrossRef の参考文献リスト等を受け取らない）
+    # プロバイダごとの同時リクエスト数（429/503・応答時間の悪化に応じて initial から max の間で自動調整）
+    "API_CONCURRENCY": {"initial": 1, "max": 4},
+    "LOOKUP_PREFETCH": 16, # DOI を先行して検索しておくファイル数 (0: 先行検索しない)
+    "FILENAME_FAST_PATH": True, # ファイル名の DOI / arXiv ID / PII で特定できれば PDF を開かない
+    "METADATA_FAST_PATH": True, # 埋め込みメタデータ (XMP / Info) が信頼できれば本文の解析・AI 解析を行わない
+    "METADATA_MIN_SCORE": METADATA_MIN_SCORE,
+    "CACHE_TTL_DAYS": 30,
+    "NEGATIVE_CACHE_TTL_DAYS": 3,
+    "PARSE_WORKERS": 0, # Legacyモードの並列解析プロセス数 (0: CPUコア数, 1: 並列化しない)
+    "JOURNAL_FINGERPRINT": False, # リネーム前に全ファイルの内容の指紋を取り、取り消し時に内容を照合できるようにする
+    "GUARDED_EXTRACTION": True, # PDF解析をメモリ・時間制限付きの子プロセスで行う
+    "PDF_BUDGET": dict(DEFAULT_BUDGET),
+    "READ_AHEAD": dict(DEFAULT_READ_AHEAD), # 次に解析する PDF をメモリに先読みする (files: 0 で無効)
+    "OCR": dict(DEFAULT_OCR, cache_path=os.path.join(APP_DATA_DIR, "ocr_cache.db")),
+    # ワーカーのプロファイリング (settings.json の "profiling" または起動時の --profile / --trace で指定)
+    "PROFILING": {"mode": None, "interval_ms": 5, "trace": False},
+    # メトリクス (port: 0 以外でローカルの HTTP エンドポイントを公開, dump: 実行ごとにファイルへ保存)
+    # settings.json の "metrics" または起動時の --metrics-port で指定
+    "METRICS": {"port": 0, "dump": True, "path": os.path.join(APP_DATA_DIR, "metrics.prom")}
 }
 
+LOOKUP_CACHE = LookupCache(
+    os.path.join(APP_DATA_DIR, "lookup_cache.json"),
+    CONFIG["CACHE_TTL_DAYS"], CONFIG["NEGATIVE_CACHE_TTL_DAYS"]
+)
+OFFLINE_INDEX = OfflineIndex(os.path.join(APP_DATA_DIR, "offline_index.db"))
+CATALOG = Catalog(os.path.join(APP_DATA_DIR, "catalog.db")) # 処理済み論文のカタログ
+# 実行中の同一検索を 1 回にまとめる
+LOOKUP_FLIGHTS = SingleFlight()
+API_LIMITERS = {
+    name: AdaptiveLimiter(name, CONFIG["API_CONCURRENCY"]["initial"], max_limit=CONFIG["API_CONCURRENCY"]["max"])
+    for name in ("semantic_scholar", "crossref")
+}
+API_LIMITERS["arxiv"] = AdaptiveLimiter("arxiv", 1, max_limit=1) # arXiv は同時接続を 1 本までとする
+
+FILES_PROCESSED = METRICS.counter("namecle_files_processed_total", "処理したファイル数", ["result"])
+QUEUE_DEPTH = METRICS.gauge("namecle_queue_depth", "処理待ちのファイル数")
+LOOKUP_CACHE_REQUESTS = METRICS.counter("namecle_lookup_cache_requests_total", "検索キャッシュの参照回数", ["result"])
+API_REQUESTS = METRICS.counter("namecle_api_requests_total", "API リクエスト数（status は HTTP ステータスまたは error）", ["provider", "status"])
+API_SECONDS = METRICS.histogram("namecle_api_request_seconds", "API の応答時間", ["provider"])
+API_CONCURRENCY = METRICS.gauge("namecle_api_concurrency_limit", "API の同時実行数の上限（自動調整値）", ["provider"])
+PDF_SECONDS = METRICS.histogram("namecle_pdf_extract_seconds", "PDF の解析時間", ["step"])
+LLM_SECONDS = METRICS.histogram("namecle_llm_extract_seconds", "AI 解析1件の所要時間")
+LLM_TOKENS = METRICS.counter("namecle_llm_tokens_total", "AI 解析で処理したトークン数", ["kind"])
+LLM_TOKENS_PER_SEC = METRICS.gauge("namecle_llm_tokens_per_second", "直近の AI 解析の生成速度")
+RENAMES = METRICS.counter("namecle_renames_total", "リネーム数", ["result"])
+RENAME_SECONDS = METRICS.histogram("namecle_rename_seconds", "リネームの所要時間")
+for _name, _limiter in API_LIMITERS.items():
+    API_CONCURRENCY.labels(_name).set_function(lambda limiter=_limiter: limiter.limit)
+
+def _fetch_arxiv(url, params):
+    # 接続先は ArxivResolver の api_url（CONFIG["ARXIV_API_URL"]）
+    response = ArticleFetcher._request("arxiv", url, params, "batch")
+    return response.status_code, response.text
+
+ARXIV_RESOLVER = ArxivResolver(_fetch_arxiv, api_url=CONFIG["ARXIV_API_URL"])
+API_KEYRINGS = {"semantic_scholar": KeyRing([])}
+
+def apply_api_options(settings, logger=print):
+    """settings.json の API キー・連絡先を CONFIG に反映する（不正な値は logger に報告して無視する）"""
+    if not isinstance(settings, dict):
+        return
+    keys = settings.get("semantic_scholar_api_keys") or settings.get("semantic_scholar_api_key") or []
+    if isinstance(keys, str):
+        keys = [keys]
+    CONFIG["SEMANTIC_SCHOLAR_API_KEYS"] = [k.strip() for k in keys if isinstance(k, str) and k.strip()]
+    mailto = settings.get("crossref_mailto")
+    CONFIG["CROSSREF_MAILTO"] = mailto.strip() if isinstance(mailto, str) else ""
+    if "semantic_scholar_key_rps" in settings:
+        try:
+            rps = float(settings["semantic_scholar_key_rps"])
+            if not rps > 0:
+                raise ValueError
+            CONFIG["SEMANTIC_SCHOLAR_KEY_RPS"] = rps
+        except (TypeError, ValueError):
+            # 不正な値では起動を止めず、既定値のまま使う
+            logger(f"[設定] semantic_scholar_key_rps が不正です（既定値 {CONFIG['SEMANTIC_SCHOLAR_KEY_RPS']} を使います）: "
+                   f"{settings['semantic_scholar_key_rps']!r}")
+
+    API_KEYRINGS["semantic_scholar"] = KeyRing(CONFIG["SEMANTIC_SCHOLAR_API_KEYS"], CONFIG["SEMANTIC_SCHOLAR_KEY_RPS"])
+    # キーの数だけ並行して送れるよう、同時実行数の上限を広げる
+    API_LIMITERS["semantic_scholar"].max_limit = CONFIG["API_CONCURRENCY"]["max"] * max(1, len(CONFIG["SEMANTIC_SCHOLAR_API_KEYS"]))
+
+try:
+    from orjson import loads as _json_loads # あれば高速な JSON パーサを使う
+except ImportError:
+    from json import loads as _json_loads
+
+# 応答から読む項目だけを要求する
+SEMANTIC_SCHOLAR_FIELDS = "title,authors,citationCount,year"
+CROSSREF_SELECT = "DOI,title,author,issued,is-referenced-by-count"
+
+def _user_agent():
+    contact = f"; mailto:{CONFIG['CROSSREF_MAILTO']}" if CONFIG["CROSSREF_MAILTO"] else ""
+    return f"Namecle/{__version__} (https://github.com/ms2224/Namecle{contact})"
+
 class GemmaSmartExtractor:
     def __init__(self, model_path):
+        from llama_cpp import Llama
 
         self.llm = Llama(
             model_path=model_path,
@@ -231,16 +364,17 @@ class GemmaSmartExtractor:
             verbose=False
         )
 
-    def _get_text_with_layout_hints(self, pdf_path):
+    def _get_text_with_layout_hints(self, pdf_path, data=None):
+        doc, _ = open_pdf_guarded(pdf_path, CONFIG["PDF_BUDGET"], data)
+        if doc is None:
+            return ""
         try:
-            doc = fitz.open(pdf_path)
             page = doc[0]
             blocks = page.get_text("dict")["blocks"]
         except Exception:
             return ""
         finally:
-            if doc:
-                doc.close()
+            doc.close()
 
         max_font_size = 0
         for b in blocks:
@@ -270,8 +404,8 @@ class GemmaSmartExtractor:
 
         return "\n".join(annotated_text)[:2500]
 
-    def extract(self, pdf_path):
-        input_text = self._get_text_with_layout_hints(pdf_path)
+    def extract(self, pdf_path, fallback_text=None, data=None):
+        input_text = self._get_text_with_layout_hints(pdf_path, data) or (fallback_text or "")[:2500]
         if not input_text: return None
 
         prompt = f"""<start_of_turn>user
@@ -295,10 +429,18 @@ Text:
 <start_of_turn>model
 ```json
 """
+        t0 = time.perf_counter()
         output = self.llm(
             prompt, max_tokens=300, temperature=0.1,
             stop=["<end_of_turn>", "```"], echo=False
         )
+        elapsed = time.perf_counter() - t0
+        LLM_SECONDS.observe(elapsed)
+        usage = output.get("usage") or {}
+        LLM_TOKENS.labels("prompt").inc(usage.get("prompt_tokens", 0))
+        LLM_TOKENS.labels("completion").inc(usage.get("completion_tokens", 0))
+        if elapsed > 0:
+            LLM_TOKENS_PER_SEC.set(usage.get("completion_tokens", 0) / elapsed)
         
         try:
             raw = output['choices'][0]['text'].strip()
@@ -311,32 +453,161 @@ Text:
 class ArticleFetcher:
     @staticmethod
     def search(title: str = None, doi: str = None, author: str = None):
+        # ローカルのオフラインインデックスを最優先で参照
+        try:
+            res = OFFLINE_INDEX.lookup(title=title, doi=doi, author=author)
+            if res:
+                timing.count("offline_index.hit")
+                return res
+        except Exception:
+            pass
+
+        key = normalize_query(title=title, doi=doi, author=author)
+        return ArticleFetcher._cached(key, lambda: ArticleFetcher._search_uncached(title, doi, author, key))
+
+    @staticmethod
+    def search_arxiv(arxiv_id):
+        """
+        arXiv ID から検索する。出版済みで DOI が登録されていればその DOI で、
+        無ければ Semantic Scholar を arXiv ID で引き、それも無ければ arXiv の書誌情報を使う
+        """
+        key = f"arxiv:{arxiv_id.lower()}"
+        return ArticleFetcher._cached(key, lambda: ArticleFetcher._search_arxiv_uncached(arxiv_id, key))
+
+    @staticmethod
+    def search_pii(pii):
+        """Elsevier の PII (S0893608019301234 など) から CrossRef で検索する"""
+        key = f"pii:{pii.upper()}"
+        return ArticleFetcher._cached(key, lambda: ArticleFetcher._search_pii_uncached(pii, key))
+
+    @staticmethod
+    def _cached(key, lookup):
+        cached = LOOKUP_CACHE.get(key)
+        if cached:
+            timing.count("lookup_cache.hit")
+            LOOKUP_CACHE_REQUESTS.labels("hit").inc()
+            return tuple(cached[1])
+        timing.count("lookup_cache.miss")
+        LOOKUP_CACHE_REQUESTS.labels("miss").inc()
+        return LOOKUP_FLIGHTS.do(key, lookup)
+
+    @staticmethod
+    def _search_pii_uncached(pii, key):
+        errors = []
+        result = ArticleFetcher._query_crossref(pii=pii, errors=errors)
+        if result is None:
+            result = None, None, None, "PIIで見つかりませんでした。"
+        found = isinstance(result[3], dict)
+        if found or not errors:
+            LOOKUP_CACHE.put(key, list(result), found)
+        return result
+
+    @staticmethod
+    def _search_arxiv_uncached(arxiv_id, key):
+        errors = []
+        try:
+            meta = ARXIV_RESOLVER.resolve(arxiv_id)
+        except Exception as e:
+            errors.append(e)
+            meta = None
+
+        result = None
+        if meta and meta["doi"]:
+            result = ArticleFetcher.search(doi=meta["doi"])
+            if not isinstance(result[3], dict):
+                result = None
+        if result is None:
+            result = ArticleFetcher._query_semantic_scholar(arxiv_id=arxiv_id, errors=errors)
+        if result is None and meta:
+            info = {"title": meta["title"], "authors": meta["authors"], "year": meta["year"], "citation_count": None, "provider": "arxiv"}
+            result = None, meta["year"], meta["authors"], info
+        if result is None:
+            result = None, None, None, "arXivで見つかりませんでした。"
+
+        found = isinstance(result[3], dict)
+        if found or not errors:
+            LOOKUP_CACHE.put(key, list(result), found)
+        return result
+
+    @staticmethod
+    def _search_uncached(title, doi, author, key):
+        errors = []
+        result = ArticleFetcher._search_providers(title, doi, author, errors)
+        found = isinstance(result[3], dict)
+        # 通信エラーやレート制限での失敗は「見つからない」として記録しない
+        if found or not errors:
+            LOOKUP_CACHE.put(key, list(result), found)
+        return result
+
+    @staticmethod
+    def _search_providers(title, doi, author, errors):
         if doi:
-            res = ArticleFetcher._query_semantic_scholar(doi=doi)
+            res = ArticleFetcher._query_semantic_scholar(doi=doi, errors=errors)
             if res: return res
-            res = ArticleFetcher._query_crossref(doi=doi)
+            res = ArticleFetcher._query_crossref(doi=doi, errors=errors)
             if res: return res
         if title:
             if author:
-                res = ArticleFetcher._query_semantic_scholar(title=title, author=author)
+                res = ArticleFetcher._query_semantic_scholar(title=title, author=author, errors=errors)
                 if res: return res
 
-                res = ArticleFetcher._query_crossref(title=title, author=author)
+                res = ArticleFetcher._query_crossref(title=title, author=author, errors=errors)
                 if res: return res
 
-            res = ArticleFetcher._query_semantic_scholar(title=title, author=None)
+            res = ArticleFetcher._query_semantic_scholar(title=title, author=None, errors=errors)
             if res: return res
             
-            res = ArticleFetcher._query_crossref(title=title, author=None)
+            res = ArticleFetcher._query_crossref(title=title, author=None, errors=errors)
             if res: return res
 
         return None, None, None, "検索で見つかりませんでした。"
 
     @staticmethod
-    def _query_semantic_scholar(title=None, doi=None, author=None):
-        base_url = "https://api.semanticscholar.org/graph/v1/paper/"
-        params = {"fields": "title,authors,citationCount,year"}
-        if doi:
+    def _request(provider, url, params, kind):
+        """プロバイダごとの同時実行数の上限内で GET を行い、応答を上限の調整に反映する"""
+        import requests
+        headers = {"User-Agent": _user_agent()}
+        keyring = API_KEYRINGS.get(provider)
+        with API_LIMITERS[provider].slot() as slot:
+            with timing.stage("api_wait", provider=provider):
+                # API キーがあればキーごとのレートで送る（固定の待ち時間は不要）
+                key = keyring.acquire() if keyring else None
+                if key:
+                    headers["x-api-key"] = key
+                elif provider == "crossref" and CONFIG["CROSSREF_MAILTO"]:
+                    time.sleep(CONFIG["POLITE_REQUEST_INTERVAL"])
+                else:
+                    time.sleep(CONFIG["API_REQUEST_INTERVAL"])
+            with timing.stage("api", provider=provider, kind=kind) as span:
+                try:
+                    response = requests.get(url, params=params, headers=headers)
+                except Exception:
+                    API_REQUESTS.labels(provider, "error").inc()
+                    raise
+                span["status"] = response.status_code
+            API_REQUESTS.labels(provider, response.status_code).inc()
+            API_SECONDS.labels(provider).observe(response.elapsed.total_seconds())
+            retry_after = response.headers.get("Retry-After")
+            if key:
+                keyring.release(key, response.status_code, retry_after)
+            slot.done(response.status_code, response.elapsed.total_seconds(), retry_after)
+        return response
+
+    @staticmethod
+    def _decode(response, provider):
+        """応答本文を JSON として読む（受信量を計測に記録する）"""
+        body = response.content
+        timing.count(f"api_bytes.{provider}", len(body))
+        with timing.stage("decode", provider=provider):
+            return _json_loads(body)
+
+    @staticmethod
+    def _query_semantic_scholar(title=None, doi=None, author=None, errors=None, arxiv_id=None):
+        base_url = CONFIG["SEMANTIC_SCHOLAR_API_URL"]
+        params = {"fields": SEMANTIC_SCHOLAR_FIELDS}
+        if arxiv_id:
+            url = base_url + f"ARXIV:{arxiv_id}"
+        elif doi:
             url = base_url + (doi if doi.upper().startswith("DOI:") else f"DOI:{doi}")
         else:
             url = base_url + "search"
@@ -348,10 +619,12 @@ class ArticleFetcher:
             params["limit"] = 1
 
         try:
-            time.sleep(1)
-            response = requests.get(url, params=params)
-            if response.status_code != 200: return None
-            data = response.json()
+            response = ArticleFetcher._request("semantic_scholar", url, params, "search" if url.endswith("search") else "id")
+            if response.status_code != 200:
+                if response.status_code != 404 and errors is not None:
+                    errors.append(response.status_code)
+                return None
+            data = ArticleFetcher._decode(response, "semantic_scholar")
             if "data" in data:
                 if not data["data"]:
                     return None
@@ -362,16 +635,29 @@ class ArticleFetcher:
             authors = ", ".join([a.get("name", "") for a in paper.get("authors", [])])
             info = {
                 "title": paper.get("title"), "authors": authors,
-                "year": paper.get("year"), "citation_count": paper.get("citationCount")
+                "year": paper.get("year"), "citation_count": paper.get("citationCount"),
+                "provider": "semantic_scholar"
             }
             return paper.get("citationCount"), paper.get("year"), authors, info
-        except: return None
+        except Exception as e:
+            if errors is not None: errors.append(e)
+            return None
 
     @staticmethod
-    def _query_crossref(title=None, doi=None, author=None):
-        base_url = "https://api.crossref.org/works"
+    def _query_crossref(title=None, doi=None, author=None, errors=None, pii=None):
+        base_url = CONFIG["CROSSREF_API_URL"]
         params = {"rows": 1}
-        if doi:
+        lean = CONFIG["LEAN_PAYLOADS"]
+        if lean:
+            params["select"] = CROSSREF_SELECT
+        if pii:
+            url = base_url
+            params["filter"] = f"alternative-id:{pii}"
+        elif doi and lean:
+            # select は一覧の問い合わせでしか使えないため、DOI もフィルタで検索する
+            url = base_url
+            params["filter"] = f"doi:{doi}"
+        elif doi:
             url = base_url + "/" + urllib.parse.quote(doi)
             params = {}
         else:
@@ -380,13 +666,18 @@ class ArticleFetcher:
             if author:
                  clean_author = author.split(",")[0]
                  params["query.author"] = clean_author
+        if CONFIG["CROSSREF_MAILTO"]:
+            params["mailto"] = CONFIG["CROSSREF_MAILTO"] # polite pool
 
         try:
-            time.sleep(1)
-            response = requests.get(url, params=params)
-            if response.status_code != 200: return None
-            data = response.json()
-            items = data.get("message", {}).get("items", []) if not doi else [data.get("message", {})]
+            response = ArticleFetcher._request("crossref", url, params, "doi" if doi else "pii" if pii else "search")
+            if response.status_code != 200:
+                if response.status_code != 404 and errors is not None:
+                    errors.append(response.status_code)
+                return None
+            data = ArticleFetcher._decode(response, "crossref")
+            message = data.get("message", {})
+            items = message.get("items", []) if "items" in message else [message]
             if not items: return None
             paper = items[0]
             date_parts = paper.get("issued", {}).get("date-parts", [[None]])
@@ -394,31 +685,62 @@ class ArticleFetcher:
             authors = ", ".join(f"{a.get('given','')} {a.get('family','')}".strip() for a in paper.get("author", []))
             info = {
                 "title": paper.get("title", [None])[0], "authors": authors,
-                "year": year, "citation_count": paper.get("is-referenced-by-count")
+                "year": year, "citation_count": paper.get("is-referenced-by-count"),
+                "doi": paper.get("DOI"), "provider": "crossref"
             }
             return info["citation_count"], year, authors, info
-        except: return None
+        except Exception as e:
+            if errors is not None: errors.append(e)
+            return None
 
 class PDFProcessor:
     
     @staticmethod
-    def extract_basic_info(pdf_path):
+    def extract_basic_info(pdf_path, data=None, metadata=False):
+        with PDF_SECONDS.labels("basic_info").time():
+            return PDFProcessor._extract_basic_info(pdf_path, data, metadata)
+
+    @staticmethod
+    def _extract_basic_info(pdf_path, data=None, metadata=False):
+        """
+        (本文, DOI, 信頼できる埋め込みメタデータ) を返す
+        metadata が True なら先に埋め込みメタデータ (XMP / Info 辞書) を読み、信頼できれば本文は読まない（PDF は1回だけ開く）
+        """
         try:
-            doc = fitz.open(pdf_path)
-            text = "".join([page.get_text() for page in doc[:CONFIG["PDF_PREVIEW_PAGES"]]])
-            
-            doi_match = re.search(r'(?i)\b(?:https?://doi\.org/|doi[:\s]*)?(10\.\d{4,9}/[-._;()/:A-Z0-9]+)\b', text)
-            doi = doi_match.group(1) if doi_match else None
-            
-            doc.close()
-            return text, doi
+            with timing.stage("open"):
+                doc, page_limit = open_pdf_guarded(pdf_path, CONFIG["PDF_BUDGET"], data)
+            if doc is None: return None, None, None
+            try:
+                meta = None
+                if metadata:
+                    with PDF_SECONDS.labels("metadata").time(), timing.stage("metadata"):
+                        meta = read_metadata(doc, pdf_path, CONFIG["MAX_AUTHORS"], CONFIG["MIN_TITLE_LENGTH"])
+                    if metadata_trusted(meta, CONFIG["METADATA_MIN_SCORE"]):
+                        return None, meta["doi"], meta
+                with timing.stage("text"):
+                    text = "".join([page.get_text() for page in doc[:page_limit or CONFIG["PDF_PREVIEW_PAGES"]]])
+
+                with timing.stage("doi_scan"):
+                    doi = find_doi(text)
+                if not doi and meta and meta["score"] >= CONFIG["METADATA_MIN_SCORE"]:
+                    # タイトルの無いメタデータでも、XMP の DOI は使う
+                    doi = meta["doi"]
+                return text, doi, None
+            finally:
+                doc.close()
         except Exception as e:
-            return None, None
+            return None, None, None
 
     @staticmethod
-    def extract_heuristics(pdf_path):
+    def extract_heuristics(pdf_path, data=None):
+        with PDF_SECONDS.labels("heuristics").time():
+            return PDFProcessor._extract_heuristics(pdf_path, data)
+
+    @staticmethod
+    def _extract_heuristics(pdf_path, data=None):
         try:
-            doc = fitz.open(pdf_path)
+            doc, page_limit = open_pdf_guarded(pdf_path, CONFIG["PDF_BUDGET"], data)
+            if doc is None: return None, None, None
             title = None
             if len(doc) > 0:
                 for block in doc[0].get_text("dict")["blocks"]:
@@ -429,11 +751,9 @@ class PDFProcessor:
                         if title: break
                     if title: break
 
-            text = "".join([page.get_text() for page in doc[:CONFIG["PDF_PREVIEW_PAGES"]]])
-            authors_match = re.findall(r'(?i)([A-Z]\.[A-Z]?\.?\s?[A-Z][a-z]+|[A-Z][a-z]+\s[A-Z][a-z]+)', text)
-            authors = ", ".join(dict.fromkeys(authors_match[:CONFIG["MAX_AUTHORS"]]))
-            year_match = re.search(r'(20\d{2}|19\d{2})', text)
-            year = year_match.group(0) if year_match else None
+            text = "".join([page.get_text() for page in doc[:page_limit or CONFIG["PDF_PREVIEW_PAGES"]]])
+            _, year, authors_list = scan_text(text, CONFIG["MAX_AUTHORS"])
+            authors = ", ".join(authors_list)
             doc.close()
             return title, authors, year
         except:
@@ -469,6 +789,14 @@ class PDFProcessor:
                 base_name = f"{prefix}{title} {authors}"
         return base_name + ext
     
+    @staticmethod
+    def title_from_filename(pdf_path):
+        stem = os.path.splitext(os.path.basename(pdf_path))[0]
+        title = re.sub(r'[_\s]+', ' ', stem).strip()
+        if len(title) <= CONFIG["MIN_TITLE_LENGTH"] or not re.search(r'[^\W\d_]', title):
+            return None
+        return title
+
     @staticmethod
     def check_similarity(str1, str2):
         if not str1 or not str2: return 0.0
@@ -513,20 +841,28 @@ class RenameWorker(QThread):
     result_signal = pyqtSignal(str, dict, str, str) 
     update_file_path_signal = pyqtSignal(str, str) 
     request_manual_input_signal = pyqtSignal(str, str) 
+    request_plan_review_signal = pyqtSignal(list)
 
     progress_signal = pyqtSignal(int, int)
 
-    def __init__(self, file_list, use_llm, manual_mode, chk_auto_title, llm_extractor):
+    def __init__(self, file_list, use_llm, manual_mode, chk_auto_title, llm_extractor, dry_run=False):
         super().__init__()
         self.file_list = file_list
         self.use_llm = use_llm
         self.manual_mode = manual_mode
         self.chk_auto_title = chk_auto_title
         self.llm_extractor = llm_extractor
+        self.dry_run = dry_run
+        self.llm_results = {} # 内容の指紋 -> AI解析結果（このバッチ内での重複ファイル用）
+        self.filename_hits = {}
+        self.read_ahead = None
+
+        self.plan = RenamePlan(new_journal_path(UNDO_DIR), CONFIG["JOURNAL_FINGERPRINT"])
         
         self.input_mutex = QMutex()
         self.input_condition = QWaitCondition()
         self.manual_input_value = None
+        self.plan_decision = False
         self.abort_flag = False
 
     def wait_for_manual_input(self, filename, default_text):
@@ -544,19 +880,271 @@ class RenameWorker(QThread):
         self.input_condition.wakeAll()
         self.input_mutex.unlock()
 
+    def wait_for_plan_review(self, entries):
+        self.input_mutex.lock()
+        self.plan_decision = False
+        self.request_plan_review_signal.emit(entries)
+        self.input_condition.wait(self.input_mutex)
+        val = self.plan_decision
+        self.input_mutex.unlock()
+        return val
+
+    def set_plan_decision(self, ok):
+        self.input_mutex.lock()
+        self.plan_decision = ok
+        self.input_condition.wakeAll()
+        self.input_mutex.unlock()
+
     def run(self):
+        profile = timing.RunProfile()
+        timing.activate(profile)
+        for limiter in API_LIMITERS.values():
+            limiter.reset_stats()
+        base = os.path.join(PROFILE_DIR, "run-" + time.strftime("%Y%m%d-%H%M%S"))
+        try:
+            mode = CONFIG["PROFILING"]["mode"]
+            if mode:
+                # QThread 内はプロファイラが自動では追跡しないため、ワーカー自身の処理を包んで計測する
+                os.makedirs(PROFILE_DIR, exist_ok=True)
+                path = run_profiled(self._run_batch, base, mode, CONFIG["PROFILING"]["interval_ms"])
+                self.log_signal.emit(f"プロファイルを保存しました: {path}")
+            else:
+                self._run_batch()
+        finally:
+            timing.activate(None)
+            profile.finish()
+            LOOKUP_CACHE.flush()
+            try:
+                # リネームしなかったバッチの空のジャーナルは残さない
+                if os.path.getsize(self.plan.manifest_path) == 0:
+                    os.remove(self.plan.manifest_path)
+            except OSError:
+                pass
+            QUEUE_DEPTH.set(0)
+            self._report_profile(profile, base)
+            if CONFIG["METRICS"]["dump"]:
+                try:
+                    METRICS.dump(CONFIG["METRICS"]["path"])
+                except OSError as e:
+                    self.log_signal.emit(f"メトリクスの保存に失敗しました: {e}")
+
+    def _report_profile(self, profile, base):
+        """段階別の所要時間サマリをログに出し、JSON/CSV で保存する"""
+        if not profile.records:
+            return
+        for name, limiter in API_LIMITERS.items():
+            st = limiter.state()
+            if st["requests"]:
+                profile.gauges[f"{name} 同時実行数"] = (
+                    f"{st['limit']} (最大 {st['peak']}/{st['max']}, 429/503: {st['throttled']}回, 待ち {st['wait_sec']}秒)"
+                )
+        for name, keyring in API_KEYRINGS.items():
+            for st in keyring.state():
+                profile.gauges[f"{name} APIキー {st['key']}"] = (
+                    f"{st['requests']} リクエスト, 429: {st['throttled']}回" + (", 無効" if st["invalid"] else "")
+                )
+        if self.read_ahead is not None:
+            st = self.read_ahead.state()
+            profile.gauges["PDF先読み"] = (
+                f"{st['hits']}/{st['hits'] + st['misses']} 件, {st['bytes_read'] / 1024 / 1024:.1f} MB"
+                f" (バッファ最大 {st['peak_buffered'] / 1024 / 1024:.1f} MB)"
+            )
+        received = sum(n for name, n in profile.counters.items() if name.startswith("api_bytes."))
+        if received:
+            profile.gauges["API 受信量"] = f"{received / 1024:.1f} KB"
+        self.log_signal.emit(profile.format_summary())
+        try:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            profile.export_json(base + ".json")
+            profile.export_csv(base + ".csv")
+            self.log_signal.emit(f"計測結果を保存しました: {base}.json / .csv")
+            if CONFIG["PROFILING"]["trace"]:
+                profile.export_chrome_trace(base + ".trace.json")
+                self.log_signal.emit(f"トレースを保存しました: {base}.trace.json")
+        except OSError as e:
+            self.log_signal.emit(f"計測結果の保存に失敗しました: {e}")
+
+    def _parse_workers(self):
+        """解析に使う子プロセス数を返す。0 のときはこのスレッド内で直接解析する"""
+        if not self.use_llm and not self.manual_mode and len(self.file_list) > 1 and CONFIG["PARSE_WORKERS"] != 1:
+            return CONFIG["PARSE_WORKERS"] or os.cpu_count() or 1
+        return 1 if CONFIG["GUARDED_EXTRACTION"] or CONFIG["OCR"]["enabled"] else 0
+
+    def _use_metadata(self):
+        # Legacy モードでタイトルの自動抽出がオフのときは、メタデータのタイトルも使わない
+        return CONFIG["METADATA_FAST_PATH"] and not self.manual_mode and (self.use_llm or self.chk_auto_title)
+
+    def _resolve_filenames(self):
+        """
+        PDF を開く前に、ファイル名に含まれる DOI / arXiv ID / PII で書誌情報を引く
+        特定できたファイルは {パス: (種類, 識別子, 引用数, info)} で返し、PDF の解析を省略する
+        """
+        if self.manual_mode or not CONFIG["FILENAME_FAST_PATH"]:
+            return {}
+        candidates = [(path, identifiers_from_filename(path)) for _, path in self.file_list]
+        candidates = [(path, ids) for path, ids in candidates if ids]
+        if not candidates:
+            return {}
+        for _, ids in candidates:
+            for kind, value in ids:
+                if kind == "arxiv":
+                    ARXIV_RESOLVER.want(value)
+
+        def resolve(item):
+            path, ids = item
+            timing.set_current_file(path)
+            with timing.stage("filename_lookup"):
+                for kind, value in ids:
+                    if self.abort_flag:
+                        break
+                    if kind == "doi":
+                        c_count, _, _, info = ArticleFetcher.search(doi=value)
+                    elif kind == "arxiv":
+                        c_count, _, _, info = ArticleFetcher.search_arxiv(value)
+                    else:
+                        c_count, _, _, info = ArticleFetcher.search_pii(value)
+                    if isinstance(info, dict):
+                        return path, (kind, value, c_count, info)
+            return path, None
+
+        self.log_signal.emit(f"ファイル名の識別子を確認中: {len(candidates)} 件")
+        hits = {}
+        executor = ThreadPoolExecutor(max_workers=max(1, CONFIG["API_CONCURRENCY"]["max"]))
+        try:
+            futures = [executor.submit(resolve, item) for item in candidates]
+            for done, future in enumerate(as_completed(futures), 1):
+                self.progress_signal.emit(done, len(candidates))
+                path, hit = future.result()
+                if hit:
+                    hits[path] = hit
+                if self.abort_flag:
+                    break
+        finally:
+            # 中止された場合は、まだ始まっていない問い合わせを取り消す
+            executor.shutdown(wait=True, cancel_futures=True)
+        self.log_signal.emit(f"ファイル名から {len(hits)} 件を特定しました（PDFの解析を省略します）。")
+        return hits
+
+    def _run_batch(self):
+        self.filename_hits = self._resolve_filenames()
+        paths = [path for _, path in self.file_list if path not in self.filename_hits]
+        workers = self._parse_workers()
+        # ネットワークドライブの読み込み待ちを解析・AI 処理と重ねるため、次のファイルを先読みしておく
+        if paths and CONFIG["READ_AHEAD"]["files"]:
+            options = dict(CONFIG["READ_AHEAD"])
+            if workers > 1:
+                # 並列解析では解析待ちのファイルをまとめて受け取るため、その分まで先読みする（メモリは max_mb で制限される）
+                options["files"] = max(options["files"], workers * PARSE_WINDOW_PER_WORKER)
+            self.read_ahead = ReadAhead(paths, **options)
+        try:
+            if workers == 0 or not paths:
+                self._process_files(None)
+                return
+
+            pool = ParsePool(
+                workers, CONFIG["PDF_PREVIEW_PAGES"], CONFIG["TITLE_FONT_SIZE_THRESHOLD"],
+                CONFIG["MIN_TITLE_LENGTH"], CONFIG["MAX_AUTHORS"], CONFIG["PDF_BUDGET"], CONFIG["OCR"],
+                metadata_min_score=CONFIG["METADATA_MIN_SCORE"] if self._use_metadata() else None,
+                read_ahead=self.read_ahead, keep_data=self.use_llm
+            )
+            if workers > 1:
+                self.log_signal.emit(f"PDF解析を {workers} プロセスで並列実行します。")
+            with pool:
+                self._process_files(pool.imap(paths))
+        finally:
+            if self.read_ahead is not None:
+                self.read_ahead.close()
+
+    def _prefetch_lookups(self, records, executor):
+        """
+        解析済みの record を少し先まで読み、DOI があれば API 検索を並行して始めておく
+        結果はキャッシュ（実行中なら SingleFlight）経由で本処理の検索が受け取る
+        arXiv ID は登録だけしておき、最初の問い合わせの際にまとめて取得する
+        """
+        depth = CONFIG["LOOKUP_PREFETCH"]
+        buffered = deque()
+        for record in records:
+            if record["doi"] and not record.get("degraded"):
+                if executor is not None:
+                    executor.submit(self._prefetch_one, record["path"], record["doi"])
+            elif record.get("arxiv"):
+                ARXIV_RESOLVER.want(record["arxiv"])
+            buffered.append(record)
+            if len(buffered) > depth:
+                yield buffered.popleft()
+        while buffered:
+            yield buffered.popleft()
+
+    @staticmethod
+    def _prefetch_one(file_path, doi):
+        timing.set_current_file(file_path)
+        ArticleFetcher.search(doi=doi)
+
+    def _process_files(self, records):
+        if records is None or not CONFIG["LOOKUP_PREFETCH"]:
+            self._process_records(records)
+            return
+        executor = None
+        if CONFIG["API_CONCURRENCY"]["max"] > 1:
+            executor = ThreadPoolExecutor(max_workers=CONFIG["API_CONCURRENCY"]["max"])
+        try:
+            self._process_records(self._prefetch_lookups(records, executor))
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True, cancel_futures=True)
+
+    def _process_records(self, records):
         count = len(self.file_list)
         for i, (widget_ref, file_path) in enumerate(self.file_list):
             if self.abort_flag: break
+            timing.set_current_file(file_path)
+            filename_hit = self.filename_hits.get(file_path)
+            record = None
+            data = None # 先読み済みのファイル内容
+            if filename_hit is None and records is not None:
+                record = next(records)
+                data = record.pop("data", None)
+                for name, duration in record["timings"].items():
+                    timing.record(name, duration)
+                PDF_SECONDS.labels("sandbox").observe(sum(record["timings"].values()))
+            elif filename_hit is None and self.read_ahead is not None:
+                with timing.stage("read_wait"):
+                    data = self.read_ahead.take(file_path)
 
             self.progress_signal.emit(i + 1, count)
+            QUEUE_DEPTH.set(count - i - 1)
             
             basename = os.path.basename(file_path)
             self.log_signal.emit(f"[{i+1}/{count}] 処理中: {basename}")
             
-            _, doi = PDFProcessor.extract_basic_info(file_path)
+            degraded = False
+            doi, arxiv_id = None, None
+            meta = None # 信頼できる埋め込みメタデータ
             info = None
             c_count = None
+            if filename_hit is not None:
+                kind, value, c_count, info = filename_hit
+                self.log_signal.emit(f"  > [API成功] ファイル名の識別子 ({kind}: {value}) で特定しました。PDFの解析をスキップします。")
+            elif record is not None:
+                doi = record["doi"]
+                arxiv_id = record.get("arxiv")
+                degraded = bool(record.get("degraded"))
+                if record.get("ocr_text"):
+                    self.log_signal.emit("  > [OCR] 画像のみのPDFのため、1ページ目上部をOCRしました。")
+                if degraded:
+                    self.log_signal.emit(f"  > [解析制限] {record['error']} -> ファイル名のみで処理します。")
+                if record.get("metadata"):
+                    meta = {k: record[k] for k in ("title", "authors", "year", "doi")}
+                    meta["source"] = record["metadata"]
+            else:
+                text, doi, meta = PDFProcessor.extract_basic_info(file_path, data, self._use_metadata())
+                if not doi:
+                    arxiv_id = (find_arxiv_id(text) if text else None) or arxiv_id_from_filename(file_path)
+            if meta:
+                timing.count("metadata.hit")
+                self.log_signal.emit(f"  > [メタデータ] 埋め込みメタデータ ({meta['source']}) を使用します。本文の解析を省略します。")
+            elif filename_hit is None and not degraded:
+                timing.count("metadata.miss")
             
             if doi:
                 self.log_signal.emit(f"  > DOI検出: {doi} -> API確認中...")
@@ -566,13 +1154,28 @@ class RenameWorker(QThread):
                 else:
                     self.log_signal.emit(f"  > [API失敗] DOIで見つかりませんでした。AI解析へ移行します。")
                     doi = None
+            elif arxiv_id and not degraded:
+                self.log_signal.emit(f"  > arXiv ID検出: {arxiv_id} -> API確認中...")
+                c_count, _, _, info = ArticleFetcher.search_arxiv(arxiv_id)
+                if isinstance(info, dict):
+                    self.log_signal.emit("  > [API成功] arXiv IDで特定しました。AI解析をスキップします。")
+                else:
+                    self.log_signal.emit("  > [API失敗] arXiv IDで見つかりませんでした。")
 
             title, authors, year = None, None, None
             source_is_llm = False
+            source_is_meta = False
+            if degraded:
+                title = PDFProcessor.title_from_filename(file_path)
+            elif meta and not isinstance(info, dict) and meta["title"]:
+                title, authors, year = meta["title"], meta["authors"], meta["year"]
+                source_is_meta = True
+                self.log_signal.emit(f"  > メタデータ(タイトル): {title}")
+                self.log_signal.emit(f"  > メタデータ(著者): {authors}")
             
-            if self.use_llm and not doi:
+            if self.use_llm and not isinstance(info, dict) and not degraded and not source_is_meta:
                 self.log_signal.emit("  > AI解析中...")
-                llm_res = self.llm_extractor.extract(file_path)
+                llm_res = self._extract_llm(file_path, record.get("ocr_text") if record else None, data)
                 if llm_res:
                     title = llm_res.get("title")
                     authors = llm_res.get("authors")
@@ -582,9 +1185,13 @@ class RenameWorker(QThread):
                     self.log_signal.emit(f"  > AI検出(著者): {authors}")
 
             if not isinstance(info, dict) and not title:
-                if not self.use_llm and self.chk_auto_title:
+                if not self.use_llm and self.chk_auto_title and not degraded:
                     self.log_signal.emit("  > 従来ロジックで解析中...")
-                    title, authors, year = PDFProcessor.extract_heuristics(file_path)
+                    if record is not None:
+                        title, authors, year = record["title"], record["authors"], record["year"]
+                    else:
+                        with timing.stage("heuristics"):
+                            title, authors, year = PDFProcessor.extract_heuristics(file_path, data)
 
             search_title = title
             search_author = authors
@@ -597,76 +1204,348 @@ class RenameWorker(QThread):
                 search_author = None
                 search_doi = None
                 source_is_llm = False
+                source_is_meta = False
             elif not doi and not title and not isinstance(info, dict):
                 self.log_signal.emit(f"  > スキップ: 手掛かりなし")
                 self.result_signal.emit(basename, {}, None, "タイトル/DOI不明")
+                FILES_PROCESSED.labels("skipped").inc()
                 continue
 
             if not isinstance(info, dict) and (search_title or search_doi):
                 c_count, _, _, info = ArticleFetcher.search(title=search_title, doi=search_doi, author=search_author)
 
+            if degraded and isinstance(info, dict) and not doi and not self.manual_mode:
+                similarity = PDFProcessor.check_similarity(search_title, info.get("title", ""))
+                if similarity < CONFIG["TITLE_SIMILARITY_THRESHOLD"]:
+                    self.log_signal.emit(f"  > ★不一致警告: ファイル名とAPI結果が一致しません ({similarity:.2f})。")
+                    info = "ファイル名から特定できませんでした"
+
+            # カタログに記録する DOI と、書誌情報の取得元
+            known_doi = search_doi or (filename_hit[1] if filename_hit is not None and filename_hit[0] == "doi" else None)
+            local_source = "llm" if source_is_llm else "metadata" if source_is_meta else "manual" if self.manual_mode else "heuristics"
             final_info = {}
             if isinstance(info, dict):
                 self.log_signal.emit(f"  > [APIあり] 引用数: {c_count}")
                 self.log_signal.emit(f"  >   Title: {info.get('title')}")
                 
-                if not doi and title and source_is_llm:
+                if not doi and title and (source_is_llm or source_is_meta):
+                    source_label = "AI" if source_is_llm else "メタデータ"
                     api_title = info.get("title", "")
                     similarity = PDFProcessor.check_similarity(title, api_title)
-                    self.log_signal.emit(f"  > タイトル一致率: {similarity:.2f} (AI vs API)")
+                    self.log_signal.emit(f"  > タイトル一致率: {similarity:.2f} ({source_label} vs API)")
                     
                     if similarity < CONFIG["TITLE_SIMILARITY_THRESHOLD"]:
-                        self.log_signal.emit("  > ★不一致警告: API結果を破棄し、AI結果を採用します。")
-                        final_info = {"title": title, "authors": authors, "year": year, "citation_count": None}
+                        self.log_signal.emit(f"  > ★不一致警告: API結果を破棄し、{source_label}結果を採用します。")
+                        final_info = {"title": title, "authors": authors, "year": year, "citation_count": None, "doi": meta["doi"] if source_is_meta else None, "provider": local_source}
                     else:
-                        final_info = {"title": info.get("title"), "authors": info.get("authors"), "year": info.get("year"), "citation_count": c_count}
+                        final_info = {
+                            "title": info.get("title"), "authors": info.get("authors"), "year": info.get("year"), "citation_count": c_count,
+                            "doi": info.get("doi") or known_doi, "provider": info.get("provider")
+                        }
                 else:
-                    final_info = {"title": info.get("title"), "authors": info.get("authors"), "year": info.get("year"), "citation_count": c_count}
+                    final_info = {
+                        "title": info.get("title"), "authors": info.get("authors"), "year": info.get("year"), "citation_count": c_count,
+                        "doi": info.get("doi") or known_doi, "provider": info.get("provider")
+                    }
             elif title and authors:
-                self.log_signal.emit("  > API検索失敗。AI抽出情報をそのまま使用します。")
-                final_info = {"title": title, "authors": authors, "year": year, "citation_count": None}
+                self.log_signal.emit(f"  > API検索失敗。{'メタデータ' if source_is_meta else 'AI抽出情報'}をそのまま使用します。")
+                final_info = {"title": title, "authors": authors, "year": year, "citation_count": None, "doi": meta["doi"] if source_is_meta else None, "provider": local_source}
             else:
                 self.result_signal.emit(basename, {}, None, str(info) if info else "検索失敗")
+                FILES_PROCESSED.labels("not_found").inc()
                 continue
 
             new_filename = PDFProcessor.generate_filename(final_info)
-            try:
-                dir_name = os.path.dirname(file_path)
-                new_path = os.path.join(dir_name, new_filename)
-
-                if os.path.exists(new_path) and os.path.normpath(new_path) != os.path.normpath(file_path):
-                    base, ext = os.path.splitext(new_filename)
-                    counter = 1
-                    while os.path.exists(os.path.join(dir_name, f"{base} ({counter}){ext}")):
-                        counter += 1
-                    new_filename = f"{base} ({counter}){ext}"
-                    new_path = os.path.join(dir_name, new_filename)
-
-                os.rename(file_path, new_path)
-
-                self.update_file_path_signal.emit(file_path, new_path)
-                self.result_signal.emit(basename, final_info, new_filename, None)
-                self.log_signal.emit(f"  > 成功: {new_filename}")
-
-            except PermissionError:
-                msg = "失敗: ファイルが開かれています。閉じてから再試行してください。"
-                self.log_signal.emit(f"  > {msg}")
-                self.result_signal.emit(basename, final_info, None, "ファイル使用中エラー")
-            
-            except Exception as e:
-                self.log_signal.emit(f"  > リネーム失敗: {e}")
-                self.result_signal.emit(basename, {}, None, str(e))
+            # 先読み済みの内容があれば指紋はファイルを読まずに計算できる
+            fingerprint = file_fingerprint(file_path, data=data) if data is not None else None
+            entry = self.plan.add(file_path, new_filename, final_info, fingerprint)
+            FILES_PROCESSED.labels("identified").inc()
+            entry["basename"] = basename
+            if not self.dry_run:
+                self._apply_entry(entry)
+
+        if self.dry_run and not self.abort_flag:
+            self._review_and_apply()
+
+    def _extract_llm(self, file_path, fallback_text, data=None):
+        """同じ内容のファイル（重複ダウンロードなど）は AI 解析を 1 回だけ行い、結果を使い回す"""
+        try:
+            fingerprint = file_fingerprint(file_path, data=data)
+        except OSError:
+            fingerprint = None
+        if fingerprint in self.llm_results:
+            timing.count("llm_dedup.hit")
+            self.log_signal.emit("  > 同じ内容のファイルを解析済みのため、AI解析結果を再利用します。")
+            return self.llm_results[fingerprint]
+        timing.count("llm_dedup.miss")
+
+        with timing.stage("llm"):
+            llm_res = self.llm_extractor.extract(file_path, fallback_text, data)
+        if fingerprint:
+            self.llm_results[fingerprint] = llm_res
+        return llm_res
+
+    def _review_and_apply(self):
+        entries = self.plan.pending()
+        if not entries:
+            return
+        self.log_signal.emit(f"リネーム計画: {len(entries)} 件。確認待ち...")
+        if not self.wait_for_plan_review(entries):
+            self.log_signal.emit("リネーム計画をキャンセルしました。")
+            for entry in entries:
+                self.result_signal.emit(entry["basename"], {}, None, "キャンセル")
+            return
+        for i, entry in enumerate(entries):
+            if self.abort_flag: break
+            self.progress_signal.emit(i + 1, len(entries))
+            self._apply_entry(entry)
+
+    def _apply_entry(self, entry):
+        basename, final_info = entry["basename"], entry["info"]
+        timing.set_current_file(entry["src"])
+        try:
+            with timing.stage("rename"), RENAME_SECONDS.time():
+                self.plan.apply_entry(entry)
+            RENAMES.labels("ok").inc()
+            new_filename = os.path.basename(entry["dst"])
+
+            self.update_file_path_signal.emit(entry["src"], entry["dst"])
+            self.result_signal.emit(basename, final_info, new_filename, None)
+            self.log_signal.emit(f"  > 成功: {new_filename}")
+            self._catalog_entry(entry)
+
+        except PermissionError:
+            entry["status"] = "failed"
+            RENAMES.labels("failed").inc()
+            msg = "失敗: ファイルが開かれています。閉じてから再試行してください。"
+            self.log_signal.emit(f"  > {msg}")
+            self.result_signal.emit(basename, final_info, None, "ファイル使用中エラー")
+        
+        except Exception as e:
+            entry["status"] = "failed"
+            RENAMES.labels("failed").inc()
+            self.log_signal.emit(f"  > リネーム失敗: {e}")
+            self.result_signal.emit(basename, {}, None, str(e))
+
+    def _catalog_entry(self, entry):
+        """リネームした結果をカタログに記録する（失敗してもリネームの結果には影響させない）"""
+        try:
+            with timing.stage("catalog"):
+                # 指紋が計画に無い場合はファイルを読み直さず、カタログに記録済みの指紋を使う
+                CATALOG.add(entry["dst"], entry["info"], entry.get("fp"), previous_path=entry["src"])
+        except Exception as e:
+            self.log_signal.emit(f"  > カタログへの記録に失敗しました: {e}")
+
+class UndoWorker(QThread):
+    log_signal = pyqtSignal(str)
+    undone_signal = pyqtSignal(int, int)
+
+    def __init__(self, journal_path):
+        super().__init__()
+        self.journal_path = journal_path
+
+    def run(self):
+        records = read_journal(self.journal_path)
+        restored, remaining = rollback_journal(self.journal_path, self.log_signal.emit)
+        # 元の名前に戻したファイルは、カタログの記録も元の場所に付け替える
+        try:
+            CATALOG.relocate([
+                (rec["dst"], rec["src"]) for rec in records
+                if os.path.exists(rec["src"]) and not os.path.exists(rec["dst"])
+            ])
+        except Exception as e:
+            self.log_signal.emit(f"カタログの更新に失敗しました: {e}")
+        self.undone_signal.emit(restored, remaining)
+
+class PlanReviewDialog(QDialog):
+    def __init__(self, entries, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle(f"リネーム計画の確認 ({len(entries)} 件)")
+        self.resize(900, 500)
+        layout = QVBoxLayout(self)
+
+        table = QTableWidget(len(entries), 2)
+        table.setHorizontalHeaderLabels(["元のファイル名", "変更後ファイル名"])
+        table.verticalHeader().setVisible(False)
+        table.setEditTriggers(QTableWidget.NoEditTriggers)
+        table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        for row, entry in enumerate(entries):
+            table.setItem(row, 0, QTableWidgetItem(os.path.basename(entry["src"])))
+            table.setItem(row, 1, QTableWidgetItem(os.path.basename(entry["dst"])))
+        layout.addWidget(table)
+
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.button(QDialogButtonBox.Ok).setText("リネーム実行")
+        buttons.button(QDialogButtonBox.Cancel).setText("キャンセル")
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        layout.addWidget(buttons)
+
+class CatalogSearchWorker(QThread):
+    """カタログの検索を GUI のスレッドの外で行う"""
+    results_signal = pyqtSignal(int, list)
+
+    def __init__(self, catalog, query, seq):
+        super().__init__()
+        self.catalog = catalog
+        self.query = query
+        self.seq = seq
+
+    def run(self):
+        try:
+            rows = self.catalog.search(self.query)
+        except Exception:
+            rows = []
+        # ネットワークドライブ上のファイルもあるため、存在確認もこのスレッドで行う
+        for row in rows:
+            row["missing"] = not os.path.exists(row["path"])
+        self.results_signal.emit(self.seq, rows)
+
+class CatalogSearchDialog(QDialog):
+    """カタログをタイトル・著者・DOI で検索する（入力のたびに検索し、ダブルクリックでファイルを開く）"""
+    def __init__(self, catalog, parent=None):
+        super().__init__(parent)
+        self.catalog = catalog
+        self.setWindowTitle("カタログ検索")
+        self.resize(1000, 560)
+        layout = QVBoxLayout(self)
+
+        self.line_query = QLineEdit()
+        self.line_query.setPlaceholderText("タイトル・著者・DOI で検索")
+        self.line_query.setClearButtonEnabled(True)
+        layout.addWidget(self.line_query)
+
+        self.table = QTableWidget(0, 6)
+        self.table.setHorizontalHeaderLabels(["年", "グレード", "引用数", "タイトル", "著者", "場所"])
+        self.table.verticalHeader().setVisible(False)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.setSelectionBehavior(QTableWidget.SelectRows)
+        header = self.table.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.Interactive)
+        header.setSectionResizeMode(3, QHeaderView.Stretch)
+        for col, width in ((0, 50), (1, 70), (2, 70), (4, 200), (5, 220)):
+            self.table.setColumnWidth(col, width)
+        self.table.cellDoubleClicked.connect(self.open_row)
+        layout.addWidget(self.table)
+
+        self.label_status = QLabel()
+        layout.addWidget(self.label_status)
+
+        # 入力が止まってから検索する
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(150)
+        self.timer.timeout.connect(self.run_search)
+        self.line_query.textChanged.connect(self.timer.start)
+        self.search_seq = 0
+        self.search_workers = set()
+        self.label_status.setText(f"{self.catalog.count()} 件を記録済み")
+
+    def run_search(self):
+        self.search_seq += 1
+        worker = CatalogSearchWorker(self.catalog, self.line_query.text(), self.search_seq)
+        worker.results_signal.connect(self.show_results)
+        worker.finished.connect(lambda: self.search_workers.discard(worker))
+        self.search_workers.add(worker)
+        worker.start()
+
+    def show_results(self, seq, rows):
+        if seq != self.search_seq:
+            # 入力が変わった後に終わった古い検索の結果は表示しない
+            return
+        self.table.setRowCount(len(rows))
+        for r, row in enumerate(rows):
+            values = [row["year"], row["grade"], row["citation_count"], row["title"], row["authors"], row["path"]]
+            missing = row["missing"]
+            for c, value in enumerate(values):
+                item = QTableWidgetItem("" if value is None else str(value))
+                if missing:
+                    item.setForeground(QBrush(Qt.gray))
+                self.table.setItem(r, c, item)
+            self.table.item(r, 5).setToolTip(row["path"] + (" (見つかりません)" if missing else ""))
+        self.label_status.setText(f"{len(rows)} 件")
+
+    def open_row(self, row, column):
+        path = self.table.item(row, 5).text()
+        if os.path.exists(path):
+            QDesktopServices.openUrl(QUrl.fromLocalFile(path))
+        else:
+            QMessageBox.warning(self, "カタログ検索", f"ファイルが見つかりません:\n{path}")
+
+def load_ui(window):
+    """
+    ビルド時に pyuic で生成した namecle_ui.py があればそれで画面を構築する（XML の解析を省略）
+    無い場合や、開発中に .ui の方が新しい場合は Namecle_UI.ui を実行時に読み込む
+    """
+    ui_path = resource_path("Namecle_UI.ui")
+    try:
+        import namecle_ui
+        stale = (
+            not getattr(sys, "frozen", False) and os.path.exists(ui_path)
+            and os.path.getmtime(ui_path) > os.path.getmtime(namecle_ui.__file__)
+        )
+        if not stale:
+            # pyuic のクラスはウィジェットを自身の属性に持つため、uic.loadUi と同じくウィンドウの属性としても参照できるようにする
+            window.ui = namecle_ui.Ui_MainWindow()
+            window.ui.setupUi(window)
+            window.__dict__.update(vars(window.ui))
+            return True
+    except ImportError:
+        pass
+
+    if not os.path.exists(ui_path):
+        return False
+    from PyQt5 import uic
+    uic.loadUi(ui_path, window)
+    return True
+
+HEADER_ICON_CACHE = os.path.join(APP_DATA_DIR, "header_icon.json")
+
+def header_icon_base64(icon_path, display_size):
+    """
+    タイトル横に表示するアイコン（表示サイズの2倍に縮小した PNG）を base64 で返す
+    縮小・エンコード結果は元画像の更新日時とサイズをキーに保存し、次回以降の起動では読み込むだけにする
+    """
+    try:
+        st = os.stat(icon_path)
+    except OSError:
+        return None
+    key = f"{st.st_mtime_ns}-{st.st_size}-{display_size}"
+    try:
+        with open(HEADER_ICON_CACHE, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+        if cached.get("key") == key:
+            return cached["data"]
+    except (OSError, ValueError, KeyError):
+        pass
+
+    image = QImage(icon_path)
+    if image.isNull():
+        return None
+    scaled_image = image.scaled(
+        display_size * 2,
+        display_size * 2,
+        Qt.KeepAspectRatio,
+        Qt.SmoothTransformation
+    )
+    ba = QBuffer()
+    ba.open(QIODevice.WriteOnly)
+    scaled_image.save(ba, "PNG")
+    data = base64.b64encode(ba.data()).decode("utf-8")
+    try:
+        with open(HEADER_ICON_CACHE, "w", encoding="utf-8") as f:
+            json.dump({"key": key, "data": data}, f)
+    except OSError:
+        pass
+    return data
 
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
 
-        ui_path = resource_path("Namecle_UI.ui")
-        if not os.path.exists(ui_path):
-            QMessageBox.critical(self, "エラー", f"ファイルが見つかりません:\n{ui_path}")
+        if not load_ui(self):
+            QMessageBox.critical(self, "エラー", f"ファイルが見つかりません:\n{resource_path('Namecle_UI.ui')}")
             sys.exit()
-            
-        uic.loadUi(ui_path, self)
 
         self.setStyleSheet(MODERN_STYLESHEET)
 
@@ -693,16 +1572,23 @@ class MainWindow(QMainWindow):
         self.setAcceptDrops(True)
         
         self.settings = self.load_settings()
+        apply_profiling_options(self.settings.get("profiling"), self.log)
+        apply_api_options(self.settings, self.log)
+        apply_metrics_options(self.settings.get("metrics"))
         self.line_model_path.setText(self.settings.get("model_path", ""))
         self.update_ui_state()
 
         self.btn_select_model.clicked.connect(self.select_model_file)
         self.btn_browse.clicked.connect(self.browse_files)
         self.btn_auto.clicked.connect(lambda: self.start_processing(manual=False))
+        self.btn_undo.clicked.connect(self.undo_last_batch)
+        self.btn_catalog.clicked.connect(self.open_catalog)
         # self.btn_manual.clicked.connect(lambda: self.start_processing(manual=True))
 
         self.llm_extractor = None
         self.worker = None
+        self.undo_worker = None
+        self.catalog_dialog = None
 
         header = self.table.horizontalHeader()
 
@@ -733,21 +1619,8 @@ class MainWindow(QMainWindow):
         icon_path = resource_path(os.path.join("assets", "icon.png"))
         icon_display_size = 40
 
-        if os.path.exists(icon_path):
-            image = QImage(icon_path)
-
-            scaled_image = image.scaled(
-                icon_display_size * 2, 
-                icon_display_size * 2, 
-                Qt.KeepAspectRatio, 
-                Qt.SmoothTransformation
-            )
-
-            ba = QBuffer()
-            ba.open(QIODevice.WriteOnly)
-            scaled_image.save(ba, "PNG")
-            base64_data = base64.b64encode(ba.data()).decode("utf-8")
-
+        base64_data = header_icon_base64(icon_path, icon_display_size)
+        if base64_data:
             html_content = (
                 f"<html><head/><body><p align='center'>"
                 f"<img src='data:image/png;base64,{base64_data}' width='{icon_display_size}' height='{icon_display_size}' style='vertical-align:middle'/>"
@@ -891,7 +1764,8 @@ class MainWindow(QMainWindow):
             use_llm, 
             manual, 
             use_legacy_logic,
-            self.llm_extractor
+            self.llm_extractor,
+            dry_run=self.chk_dry_run.isChecked()
         )
         
         self.worker.progress_signal.connect(self.update_progress)
@@ -900,6 +1774,7 @@ class MainWindow(QMainWindow):
         self.worker.result_signal.connect(self.add_result_row)
         self.worker.update_file_path_signal.connect(self.update_widget_path)
         self.worker.request_manual_input_signal.connect(self.handle_manual_input)
+        self.worker.request_plan_review_signal.connect(self.handle_plan_review)
         self.worker.finished.connect(self.on_process_finished)
         
         self.worker.start()
@@ -909,6 +1784,48 @@ class MainWindow(QMainWindow):
         if self.worker:
             self.worker.set_manual_input(text, ok)
 
+    def undo_last_batch(self):
+        if self.worker or self.undo_worker: return
+        journals = list_journals(UNDO_DIR)
+        if not journals:
+            QMessageBox.information(self, "元に戻す", "元に戻せるリネーム履歴がありません。")
+            return
+        journal = journals[0]
+        ret = QMessageBox.question(
+            self, "元に戻す",
+            f"直前のリネーム処理を元に戻しますか？\n({os.path.basename(journal)})"
+        )
+        if ret != QMessageBox.Yes: return
+
+        self.btn_auto.setEnabled(False)
+        self.btn_undo.setEnabled(False)
+        self.undo_worker = UndoWorker(journal)
+        self.undo_worker.log_signal.connect(self.log)
+        self.undo_worker.undone_signal.connect(self.on_undo_finished)
+        self.undo_worker.start()
+
+    def open_catalog(self):
+        if not CATALOG.available():
+            QMessageBox.information(self, "カタログ検索", "まだ処理済みの論文がありません。")
+            return
+        if self.catalog_dialog is None:
+            self.catalog_dialog = CatalogSearchDialog(CATALOG, self)
+        self.catalog_dialog.show()
+        self.catalog_dialog.raise_()
+        self.catalog_dialog.line_query.setFocus()
+
+    def on_undo_finished(self, restored, remaining):
+        self.btn_auto.setEnabled(True)
+        self.btn_undo.setEnabled(True)
+        self.statusbar.showMessage(f"{restored} 件を元に戻しました。", 5000)
+        self.undo_worker = None
+
+    def handle_plan_review(self, entries):
+        dialog = PlanReviewDialog(entries, self)
+        ok = dialog.exec_() == QDialog.Accepted
+        if self.worker:
+            self.worker.set_plan_decision(ok)
+
     def update_widget_path(self, old_path, new_path):
         for i in range(self.list_widget.count()):
             item = self.list_widget.item(i)
@@ -953,15 +1870,136 @@ class MainWindow(QMainWindow):
             self.table.setItem(row, 5, QTableWidgetItem(info.get("authors", "")))
             self.table.setItem(row, 6, QTableWidgetItem(str(new_name)))
 
+def apply_profiling_options(options, logger=print):
+    """settings.json の "profiling" を CONFIG に反映する（不正な値は logger に報告して無視する）"""
+    if not isinstance(options, dict):
+        return
+    if "mode" in options:
+        if options["mode"] in PROFILE_MODES:
+            CONFIG["PROFILING"]["mode"] = options["mode"]
+        else:
+            if options["mode"]:
+                logger(f"[設定] プロファイルの種類が不正です（無効にします）: {options['mode']!r}")
+            CONFIG["PROFILING"]["mode"] = None
+    if "interval_ms" in options:
+        try:
+            interval = float(options["interval_ms"])
+            if not interval > 0:
+                raise ValueError
+            CONFIG["PROFILING"]["interval_ms"] = interval
+        except (TypeError, ValueError):
+            logger(f"[設定] プロファイルの間隔が不正です（{CONFIG['PROFILING']['interval_ms']} ミリ秒を使います）: "
+                   f"{options['interval_ms']!r}")
+    if "trace" in options:
+        CONFIG["PROFILING"]["trace"] = bool(options["trace"])
+
+def parse_profiling_args(argv):
+    """--profile[=cprofile|sampling] / --trace を解釈する（設定ファイルより優先）"""
+    options = {}
+    for arg in argv:
+        if arg == "--profile":
+            options["mode"] = "cprofile"
+        elif arg.startswith("--profile="):
+            options["mode"] = arg.split("=", 1)[1]
+        elif arg == "--trace":
+            options["trace"] = True
+    return options
+
+def apply_metrics_options(options):
+    """settings.json の "metrics" を CONFIG に反映する"""
+    if not isinstance(options, dict):
+        return
+    for key in ("port", "dump", "path"):
+        if key in options:
+            CONFIG["METRICS"][key] = options[key]
+
+def parse_metrics_args(argv, logger=print):
+    """--metrics-port[=ポート番号] を解釈する（設定ファイルより優先）"""
+    options = {}
+    for arg in argv:
+        if arg == "--metrics-port":
+            options["port"] = DEFAULT_METRICS_PORT
+        elif arg.startswith("--metrics-port="):
+            value = arg.split("=", 1)[1]
+            if parse_port(value) is None:
+                logger(f"[メトリクス] --metrics-port のポート番号が不正です: {value!r}")
+            else:
+                options["port"] = parse_port(value)
+    return options
+
+def start_metrics_server(logger=print):
+    """ポートが設定されていれば、メトリクスをローカルの HTTP エンドポイントで公開する"""
+    if not CONFIG["METRICS"]["port"]:
+        return None
+    port = parse_port(CONFIG["METRICS"]["port"])
+    if port is None:
+        logger(f"[メトリクス] ポート番号が不正です: {CONFIG['METRICS']['port']!r}")
+        return None
+    try:
+        return MetricsServer(METRICS, port=port).start()
+    except OSError as e:
+        logger(f"[メトリクス] エンドポイントを開始できません: {e}")
+        return None
+
+def _process_start_time():
+    """プロセスの生成時刻（UNIX時間）。exe の展開やインタプリタ起動の時間も含めて計測するために使う"""
+    if sys.platform != "win32":
+        return None
+    try:
+        import ctypes
+        from ctypes import wintypes
+        creation, exit_, kernel, user = (wintypes.FILETIME() for _ in range(4))
+        kernel32 = ctypes.windll.kernel32
+        if not kernel32.GetProcessTimes(kernel32.GetCurrentProcess(), ctypes.byref(creation),
+                                        ctypes.byref(exit_), ctypes.byref(kernel), ctypes.byref(user)):
+            return None
+        ticks = (creation.dwHighDateTime << 32) | creation.dwLowDateTime
+        return ticks / 1e7 - 11644473600
+    except Exception:
+        return None
+
+def write_startup_probe(path, marks):
+    """起動の各時点を JSON で保存する（benchmarks/bench_startup.py --exe で使用）"""
+    data = dict(marks, process_start=_process_start_time(), module_start=STARTUP_T0, frozen=getattr(sys, "frozen", False))
+    try:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+    except OSError:
+        pass
+
+def _arg_value(argv, name):
+    for i, arg in enumerate(argv):
+        if arg == name and i + 1 < len(argv):
+            return argv[i + 1]
+        if arg.startswith(name + "="):
+            return arg.split("=", 1)[1]
+    return None
+
 if __name__ == "__main__":
+    marks = {}
     app = QApplication(sys.argv)
     wnd = MainWindow()
+    marks["window_created"] = time.time()
+    apply_profiling_options(parse_profiling_args(sys.argv[1:]), wnd.log)
+    apply_metrics_options(parse_metrics_args(sys.argv[1:], wnd.log))
     wnd.show()
 
-    try:
-        import pyi_splash
-        pyi_splash.close()
-    except ImportError:
-        pass
-    
+    def on_ready():
+        # 最初の描画が終わってからスプラッシュを閉じる（ウィンドウが出る前に消えて空白になるのを防ぐ）
+        marks["window_ready"] = time.time()
+        try:
+            import pyi_splash
+            pyi_splash.close()
+        except ImportError:
+            pass
+        probe_path = _arg_value(sys.argv[1:], "--startup-probe")
+        if probe_path:
+            write_startup_probe(probe_path, marks)
+        if "--exit-when-ready" in sys.argv:
+            app.quit()
+            return
+        preload_modules()
+        wnd.metrics_server = start_metrics_server(wnd.log)
+
+    QTimer.singleShot(0, on_ready)
     sys.exit(app.exec_())
\ No newline at end of file
@@ -0,0 +1,209 @@
+import os
+import sys
+import json
+import time
+import shutil
+import random
+import argparse
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+# Namecle ベンチマーク
+#   合成コーパスとモックAPIサーバーを使い、各段階のスループットと p50/p95 レイテンシを計測する
+#   使い方: python benchmarks/bench_namecle.py --files 200 --latency-ms 50 [--json result.json]
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = (len(values) - 1) * q
+    lo = int(k)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+
+def summarize(name, latencies, wall):
+    return {
+        "stage": name,
+        "count": len(latencies),
+        "wall_sec": wall,
+        "throughput_per_sec": len(latencies) / wall if wall > 0 else 0.0,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+    }
+
+
+def timed(name, items, func):
+    latencies = []
+    start = time.perf_counter()
+    for item in items:
+        t0 = time.perf_counter()
+        func(item)
+        latencies.append(time.perf_counter() - t0)
+    return summarize(name, latencies, time.perf_counter() - start)
+
+
+def timed_concurrent(name, items, func, threads):
+    def run(item):
+        t0 = time.perf_counter()
+        func(item)
+        return time.perf_counter() - t0
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        latencies = list(executor.map(run, items))
+    return summarize(name, latencies, time.perf_counter() - start)
+
+
+def print_report(results):
+    print(f"{'stage':<28}{'count':>8}{'wall(s)':>10}{'items/s':>12}{'p50(ms)':>10}{'p95(ms)':>10}")
+    for r in results:
+        print(f"{r['stage']:<28}{r['count']:>8}{r['wall_sec']:>10.2f}{r['throughput_per_sec']:>12.1f}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Namecle benchmark")
+    parser.add_argument("--files", type=int, default=100)
+    parser.add_argument("--max-pages", type=int, default=8)
+    parser.add_argument("--doi-ratio", type=float, default=0.6)
+    parser.add_argument("--arxiv-ratio", type=float, default=0.2, help="本文に arXiv ID が印字されたプレプリントの割合")
+    parser.add_argument("--metadata-ratio", type=float, default=0.5, help="正しい埋め込みメタデータ (Info 辞書) を持つ PDF の割合")
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--api-interval", type=float, default=0.0, help="API呼び出し前の待ち時間 (秒)")
+    parser.add_argument("--throttle-rps", type=float, default=0, help="モックAPIが429を返し始める1秒あたりのリクエスト数 (0: 制限なし)")
+    parser.add_argument("--api-keys", type=int, default=0, help="Semantic Scholar 用のダミー API キーの数（モックはキーごとに --throttle-rps を適用）")
+    parser.add_argument("--retry-after", type=float, default=1, help="429応答の Retry-After (秒)")
+    parser.add_argument("--lookup-threads", type=int, default=8, help="並行検索ステージのスレッド数")
+    parser.add_argument("--max-concurrency", type=int, default=4, help="プロバイダごとの同時実行数の上限")
+    parser.add_argument("--workers", type=int, default=0, help="Legacyモードの解析プロセス数 (0: CPUコア数)")
+    parser.add_argument("--skip-pipeline", action="store_true")
+    parser.add_argument("--json", help="結果をJSONで保存するパス")
+    parser.add_argument("--keep", action="store_true", help="作業ディレクトリを削除しない")
+    args = parser.parse_args(argv)
+
+    work_dir = tempfile.mkdtemp(prefix="namecle_bench_")
+    # キャッシュ等を作業ディレクトリに隔離してから本体を読み込む
+    os.environ["LOCALAPPDATA"] = os.path.join(work_dir, "appdata")
+
+    from corpus import generate_corpus
+    from mock_api import MockApiServer, MockState
+    import Namecle_Windows as nw
+
+    results = []
+    server = None
+    try:
+        t0 = time.perf_counter()
+        corpus = generate_corpus(os.path.join(work_dir, "corpus"), args.files, args.doi_ratio, args.max_pages, arxiv_ratio=args.arxiv_ratio, metadata_ratio=args.metadata_ratio)
+        print(f"コーパス生成: {len(corpus)} 件 ({time.perf_counter() - t0:.1f} 秒)")
+
+        state = MockState(args.latency_ms, args.jitter_ms, args.error_rate, args.throttle_rps, args.retry_after)
+        for _, meta in corpus:
+            state.add_paper(meta["doi"], meta["title"], meta["authors"], meta["year"], meta["citation_count"], meta["arxiv"])
+        server = MockApiServer(state).start()
+        nw.CONFIG["SEMANTIC_SCHOLAR_API_URL"] = server.base_url + "/graph/v1/paper/"
+        nw.CONFIG["CROSSREF_API_URL"] = server.base_url + "/works"
+        nw.CONFIG["ARXIV_API_URL"] = server.base_url + "/api/query"
+        nw.CONFIG["API_REQUEST_INTERVAL"] = args.api_interval
+        nw.CONFIG["PARSE_WORKERS"] = args.workers
+        nw.CONFIG["API_CONCURRENCY"]["max"] = args.max_concurrency
+        for limiter in nw.API_LIMITERS.values():
+            limiter.max_limit = args.max_concurrency
+        if args.api_keys:
+            nw.apply_api_options({
+                "semantic_scholar_api_keys": [f"bench-key-{i}" for i in range(args.api_keys)],
+                "semantic_scholar_key_rps": args.throttle_rps or 100,
+            })
+
+        paths = [p for p, _ in corpus]
+        results.append(timed("extract_basic_info", paths, nw.PDFProcessor.extract_basic_info))
+        results.append(timed("extract_heuristics", paths, nw.PDFProcessor.extract_heuristics))
+        trusted = []
+        results.append(timed("extract_basic_info (metadata)", paths, lambda p: trusted.append(
+            nw.PDFProcessor.extract_basic_info(p, metadata=True)[2] is not None)))
+
+        rng = random.Random(1)
+        infos = [dict(meta, authors=", ".join(meta["authors"])) for _, meta in corpus] * 10
+        results.append(timed("generate_filename", infos, lambda info: nw.PDFProcessor.generate_filename(dict(info))))
+        pairs = [(m["title"], corpus[rng.randrange(len(corpus))][1]["title"]) for _, m in corpus] * 10
+        results.append(timed("check_similarity", pairs, lambda p: nw.PDFProcessor.check_similarity(*p)))
+
+        queries = [(m["doi"], None if m["doi"] else m["title"]) for _, m in corpus]
+        lookup = lambda q: nw.ArticleFetcher.search(doi=q[0], title=q[1])
+        results.append(timed("lookup (cold)", queries, lookup))
+        results.append(timed("lookup (warm cache)", queries, lookup))
+
+        # 応答の軽量化（select= / fields=）の効果: CrossRef の DOI 検索を全項目・必要項目だけで比べる
+        payloads = {}
+        dois = [m["doi"] for _, m in corpus if m["doi"]]
+        for lean in (False, True):
+            nw.CONFIG["LEAN_PAYLOADS"] = lean
+            sent = state.bytes_sent
+            name = f"crossref doi ({'lean' if lean else 'full'})"
+            results.append(timed(name, dois, lambda doi: nw.ArticleFetcher._query_crossref(doi=doi)))
+            payloads[name] = state.bytes_sent - sent
+
+        arxiv_ids = [m["arxiv"] for _, m in corpus if m["arxiv"]]
+        arxiv_requests = nw.ARXIV_RESOLVER.requests
+        for arxiv_id in arxiv_ids:
+            nw.ARXIV_RESOLVER.want(arxiv_id)
+        results.append(timed("arxiv lookup (batched)", arxiv_ids, nw.ArticleFetcher.search_arxiv))
+        arxiv_requests = nw.ARXIV_RESOLVER.requests - arxiv_requests
+
+        nw.LOOKUP_CACHE.clear()
+        for limiter in nw.API_LIMITERS.values():
+            limiter.reset_stats()
+        results.append(timed_concurrent("lookup (concurrent)", queries, lookup, args.lookup_threads))
+        limits = {name: limiter.state() for name, limiter in nw.API_LIMITERS.items()}
+
+        if not args.skip_pipeline:
+            results.append(run_pipeline(nw, corpus, work_dir))
+
+        api = {"requests": state.requests, "bytes_sent": state.bytes_sent, "throttled": state.throttled}
+        print_report(results)
+        print(f"モックAPI: {api['requests']} リクエスト, {api['bytes_sent'] / 1024:.1f} KB, 429: {api['throttled']} 回")
+        print(f"arXiv: {len(arxiv_ids)} 件を {arxiv_requests} リクエストで解決")
+        print(f"埋め込みメタデータ: {sum(trusted)}/{len(trusted)} 件を採用（本文の解析を省略）")
+        for name, size in payloads.items():
+            print(f"受信量 {name}: {size / 1024:.1f} KB ({size / max(1, len(dois)):.0f} B/件)")
+        for name, st in limits.items():
+            print(f"同時実行数 ({name}, 並行検索後): {st['limit']} (最大 {st['peak']}/{st['max']}, 429/503: {st['throttled']} 回)")
+        for st in nw.API_KEYRINGS["semantic_scholar"].state():
+            print(f"APIキー {st['key']}: {st['requests']} リクエスト, 429: {st['throttled']} 回")
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump({"args": vars(args), "stages": results, "api": api, "limits": limits, "arxiv_requests": arxiv_requests, "payload_bytes": payloads}, f, ensure_ascii=False, indent=2)
+    finally:
+        if server:
+            server.stop()
+        if not args.keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    return 0
+
+
+def run_pipeline(nw, corpus, work_dir):
+    """RenameWorker を（スレッドを起動せずに）同期実行し、1ファイルごとの所要時間を計測する"""
+    pipeline_dir = os.path.join(work_dir, "pipeline")
+    shutil.copytree(os.path.dirname(corpus[0][0]), pipeline_dir)
+    nw.LOOKUP_CACHE.clear()
+    file_list = [(None, os.path.join(pipeline_dir, os.path.basename(p))) for p, _ in corpus]
+
+    worker = nw.RenameWorker(file_list, False, False, True, None)
+    marks = []
+    worker.progress_signal.connect(lambda current, total: marks.append(time.perf_counter()))
+    start = time.perf_counter()
+    worker.run()
+    end = time.perf_counter()
+    marks.append(end)
+    latencies = [b - a for a, b in zip(marks, marks[1:])]
+    return summarize("pipeline (legacy)", latencies, end - start)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+import time
+import subprocess
+
+# 起動時間ベンチマーク
+#   新しいプロセスで Namecle_Windows を読み込み、ウィンドウが表示されるまでの時間を計測する
+#   使い方: python benchmarks/bench_startup.py --runs 5 [--budget-ms 1500] [--json result.json]
+#   --budget-ms を超えた場合（中央値）は終了コード 1 を返すので、CI の性能ゲートとして使える
+#   --exe dist/Namecle_Windows/Namecle_Windows.exe を指定すると、ビルド済み exe の起動（展開を含む）から
+#   ウィンドウの描画完了までを計測する
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("llama_cpp", "fitz", "requests")
+
+CHILD = r"""
+import sys, time, json
+t0 = time.perf_counter()
+import Namecle_Windows as nw
+t1 = time.perf_counter()
+from PyQt5.QtWidgets import QApplication
+app = QApplication(sys.argv)
+wnd = nw.MainWindow()
+t2 = time.perf_counter()
+wnd.show()
+app.processEvents()
+t3 = time.perf_counter()
+print(json.dumps({
+    "import_ms": (t1 - t0) * 1000,
+    "window_ms": (t2 - t1) * 1000,
+    "show_ms": (t3 - t2) * 1000,
+    "total_ms": (t3 - t0) * 1000,
+    "heavy_loaded": [m for m in %r if m in sys.modules],
+}))
+""" % (HEAVY_MODULES,)
+
+
+def run_once(app_data):
+    env = dict(os.environ, LOCALAPPDATA=app_data, XDG_DATA_HOME=app_data)
+    env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    out = subprocess.run(
+        [sys.executable, "-c", CHILD], cwd=REPO_DIR, env=env,
+        capture_output=True, text=True, check=True
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def run_exe_once(exe, app_data):
+    """exe を --startup-probe 付きで起動し、ウィンドウ描画完了までの時間を返す"""
+    probe = os.path.join(app_data, "startup_probe.json")
+    if os.path.exists(probe):
+        os.remove(probe)
+    env = dict(os.environ, LOCALAPPDATA=app_data)
+    launched = time.time()
+    subprocess.run([exe, "--startup-probe", probe, "--exit-when-ready"], env=env, check=True, timeout=120)
+    with open(probe, "r", encoding="utf-8") as f:
+        marks = json.load(f)
+    result = {
+        "total_ms": (marks["window_ready"] - launched) * 1000,
+        "bootstrap_ms": (marks["module_start"] - launched) * 1000,
+        "window_ms": (marks["window_created"] - marks["module_start"]) * 1000,
+        "show_ms": (marks["window_ready"] - marks["window_created"]) * 1000,
+        "heavy_loaded": [],
+    }
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Namecle startup benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=0, help="起動時間（中央値）の上限。0 なら判定しない")
+    parser.add_argument("--json", help="結果をJSONで保存するパス")
+    parser.add_argument("--exe", help="ビルド済み exe のパス（指定時は exe の起動時間を計測）")
+    args = parser.parse_args(argv)
+
+    if args.exe:
+        measure = lambda app_data: run_exe_once(os.path.abspath(args.exe), app_data)
+        keys = ("bootstrap_ms", "window_ms", "show_ms", "total_ms")
+    else:
+        measure = run_once
+        keys = ("import_ms", "window_ms", "show_ms", "total_ms")
+
+    app_data = tempfile.mkdtemp(prefix="namecle_startup_")
+    try:
+        # 1回目は .pyc やアイコンキャッシュの生成を含むため、計測から除外する
+        cold = measure(app_data)
+        print(f"初回起動: {cold['total_ms']:.0f} ms")
+        runs = [measure(app_data) for _ in range(args.runs)]
+    finally:
+        shutil.rmtree(app_data, ignore_errors=True)
+
+    median = {k: sorted(r[k] for r in runs)[len(runs) // 2] for k in keys}
+    print(f"{'stage':<12}{'median(ms)':>12}")
+    for k in keys:
+        print(f"{k[:-3]:<12}{median[k]:>12.1f}")
+    heavy = sorted({m for r in runs for m in r["heavy_loaded"]})
+    if heavy:
+        print(f"起動時に読み込まれた重いモジュール: {', '.join(heavy)}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"cold": cold, "runs": runs, "median": median, "budget_ms": args.budget_ms}, f, indent=2)
+
+    if args.budget_ms and median["total_ms"] > args.budget_ms:
+        print(f"起動時間が予算を超えています: {median['total_ms']:.0f} ms > {args.budget_ms:.0f} ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+import os
+import random
+
+import fitz
+
+# ベンチマーク用の合成PDFコーパス生成
+
+FONTS = ["helv", "tiro", "cour"]
+WORDS = (
+    "learning neural network graph attention robust efficient scalable analysis model "
+    "estimation adaptive sparse deep transformer inference optimization stochastic "
+    "representation benchmark survey dynamic structure semantic retrieval"
+).split()
+NAMES = [
+    "Taro Yamada", "Hanako Suzuki", "John Smith", "Maria Garcia", "Wei Zhang",
+    "Anna Müller", "Kenji Sato", "Emily Brown", "Lucas Martin", "Aiko Tanaka",
+]
+
+
+def _sentence(rng, n):
+    return " ".join(rng.choice(WORDS) for _ in range(n)).capitalize() + "."
+
+
+def make_paper_meta(i, rng, doi_ratio, arxiv_ratio=0.0, metadata_ratio=0.0):
+    title = f"Benchmark Paper {i}: " + " ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 10))).title()
+    return {
+        "title": title,
+        "authors": rng.sample(NAMES, rng.randint(1, 5)),
+        "year": rng.randint(1990, 2024),
+        "citation_count": int(rng.paretovariate(1.2) * 5),
+        "doi": f"10.5555/bench.{i}" if rng.random() < doi_ratio else None,
+        "arxiv": f"{rng.randint(15, 24)}{rng.randint(1, 12):02d}.{i:05d}" if rng.random() < arxiv_ratio else None,
+        # 出版社の PDF のように正しい Info 辞書を持つか（False なら作成ソフトの既定値のようなものを入れる）
+        "embedded": rng.random() < metadata_ratio,
+    }
+
+
+def write_pdf(path, meta, rng, max_pages=8):
+    doc = fitz.open()
+    font = rng.choice(FONTS)
+    for page_no in range(rng.randint(1, max_pages)):
+        page = doc.new_page()
+        y = 72
+        if page_no == 0:
+            page.insert_text((72, y), meta["title"][:60], fontsize=rng.randint(16, 24), fontname=font)
+            y += 40
+            page.insert_text((72, y), ", ".join(meta["authors"]), fontsize=11, fontname=font)
+            y += 20
+            page.insert_text((72, y), f"Published {meta['year']}", fontsize=10, fontname=font)
+            y += 20
+            if meta["arxiv"]:
+                # プレプリント版: 出版後の DOI ではなく arXiv ID が印字されている
+                page.insert_text((20, 400), f"arXiv:{meta['arxiv']}v1 [cs.LG]", fontsize=9, fontname=font)
+            elif meta["doi"]:
+                page.insert_text((72, y), f"doi: {meta['doi']}", fontsize=9, fontname=font)
+                y += 20
+        while y < 760:
+            page.insert_text((72, y), _sentence(rng, 12), fontsize=rng.choice([9, 10, 11]), fontname=font)
+            y += 14
+    if meta.get("embedded"):
+        doc.set_metadata({"title": meta["title"], "author": "; ".join(meta["authors"]), "subject": f"doi:{meta['doi']}" if meta["doi"] else ""})
+    else:
+        doc.set_metadata({"title": f"Microsoft Word - {os.path.basename(path)[:-4]}.docx", "author": "Administrator"})
+    doc.save(path)
+    doc.close()
+
+
+def generate_corpus(out_dir, count, doi_ratio=0.6, max_pages=8, seed=0, arxiv_ratio=0.0, metadata_ratio=0.0):
+    """PDF を count 件生成し、[(path, meta), ...] を返す"""
+    os.makedirs(out_dir, exist_ok=True)
+    rng = random.Random(seed)
+    corpus = []
+    for i in range(count):
+        meta = make_paper_meta(i, rng, doi_ratio, arxiv_ratio, metadata_ratio)
+        path = os.path.join(out_dir, f"download_{i:05d}.pdf")
+        write_pdf(path, meta, rng, max_pages)
+        corpus.append((path, meta))
+    return corpus
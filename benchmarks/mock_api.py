@@ -0,0 +1,220 @@
+import re
+import sys
+import json
+import time
+import random
+import threading
+from collections import deque
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ベンチマーク用の Semantic Scholar / CrossRef 互換モックサーバー
+# 既知の DOI・タイトルを登録しておき、遅延やエラー率を設定して応答する
+# arXiv の id_list クエリ（Atom）にも対応する
+# throttle_rps を指定すると、1秒あたりのリクエスト数を超えた分に 429 (Retry-After 付き) を返す
+# （x-api-key ヘッダ付きのリクエストはキーごとに数える）
+# CrossRef の応答は実際と同様に参考文献リスト等を含む大きなもので、select= / fields= を指定すると必要な項目だけを返す
+
+
+class MockState:
+    def __init__(self, latency_ms=50, jitter_ms=0, error_rate=0.0, throttle_rps=0, retry_after=1):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.throttle_rps = throttle_rps
+        self.retry_after = retry_after
+        self.throttled = 0
+        self._windows = {}
+        self.papers_by_doi = {}
+        self.papers_by_arxiv = {}
+        self.papers_by_title = {}
+        self.requests = 0
+        self.bytes_sent = 0
+        self.lock = threading.Lock()
+
+    def add_paper(self, doi, title, authors, year, citation_count, arxiv_id=None):
+        paper = {"doi": doi, "title": title, "authors": authors, "year": year, "citation_count": citation_count, "arxiv": arxiv_id}
+        if doi:
+            self.papers_by_doi[doi.lower()] = paper
+        if arxiv_id:
+            self.papers_by_arxiv[arxiv_id] = paper
+        self.papers_by_title[_norm(title)] = paper
+
+    def check_throttle(self, api_key=None):
+        """直近1秒のリクエスト数（API キーごと）が上限を超えていれば True（呼び出し側で 429 を返す）"""
+        if not self.throttle_rps:
+            return False
+        with self.lock:
+            window = self._windows.setdefault(api_key, deque())
+            now = time.monotonic()
+            while window and now - window[0] > 1.0:
+                window.popleft()
+            if len(window) >= self.throttle_rps:
+                self.throttled += 1
+                return True
+            window.append(now)
+            return False
+
+    def find_title(self, query):
+        q = _norm(query)
+        for norm_title, paper in self.papers_by_title.items():
+            if norm_title and (norm_title in q or q in norm_title):
+                return paper
+        return None
+
+
+def _norm(s):
+    return re.sub(r'\W+', '', (s or "").lower())
+
+
+def _select(item, fields):
+    if not fields:
+        return item
+    keep = {f.strip() for f in fields.split(",")}
+    return {k: v for k, v in item.items() if k in keep}
+
+
+def _s2_paper(p, fields=None):
+    paper = {
+        "paperId": f"mock{abs(hash(p['title'])) % 10**8}",
+        "title": p["title"], "year": p["year"], "citationCount": p["citation_count"],
+        "authors": [{"authorId": str(i), "name": a} for i, a in enumerate(p["authors"])],
+    }
+    # fields 未指定時は paperId と title だけを返す（実際の API と同じ）
+    return _select(paper, "paperId," + (fields or "title"))
+
+
+def _crossref_item(p, select=None):
+    given_family = [a.rsplit(" ", 1) if " " in a else ["", a] for a in p["authors"]]
+    item = {
+        "DOI": p["doi"], "title": [p["title"]],
+        "author": [{"given": g, "family": f, "sequence": "additional", "affiliation": [{"name": "Mock University"}]} for g, f in given_family],
+        "issued": {"date-parts": [[p["year"]]]},
+        "is-referenced-by-count": p["citation_count"],
+        "publisher": "Mock Publisher", "type": "journal-article", "container-title": ["Journal of Mock Studies"],
+        "license": [{"URL": "http://creativecommons.org/licenses/by/4.0/", "content-version": "vor", "delay-in-days": 0}],
+        "funder": [{"name": f"Mock Foundation {i}", "DOI": f"10.13039/50110000{i}", "award": [f"GRANT-{i:05d}"]} for i in range(5)],
+        "link": [{"URL": f"https://example.org/{p['doi']}/fulltext.{ext}", "content-type": f"application/{ext}"} for ext in ("pdf", "xml")],
+        # 実際の応答では数十〜数百件の参考文献が含まれ、本文の大半を占める
+        "reference": [
+            {"key": f"ref{i}", "DOI": f"10.9999/mock.ref.{i}", "author": "Author R", "year": str(1990 + i % 30),
+             "unstructured": f"Author R, et al. A referenced work number {i} on a related topic. Journal of Mock Studies {i % 40}, {i}-{i + 12}."}
+            for i in range(60)
+        ],
+        "reference-count": 60,
+    }
+    return _select(item, select)
+
+
+def _arxiv_feed(papers):
+    from xml.sax.saxutils import escape
+    entries = []
+    for p in papers:
+        authors = "".join(f"<author><name>{escape(a)}</name></author>" for a in p["authors"])
+        doi = f"<arxiv:doi>{escape(p['doi'])}</arxiv:doi>" if p["doi"] else ""
+        entries.append(
+            f"<entry><id>http://arxiv.org/abs/{p['arxiv']}v1</id><title>{escape(p['title'])}</title>"
+            f"<published>{p['year']}-01-01T00:00:00Z</published>{authors}{doi}</entry>"
+        )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<feed xmlns="http://www.w3.org/2005/Atom" xmlns:arxiv="http://arxiv.org/schemas/atom">'
+        + "".join(entries) + "</feed>"
+    )
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    state = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, headers=None, content_type="application/json"):
+        data = body.encode("utf-8") if isinstance(body, str) else json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+        with self.state.lock:
+            self.state.bytes_sent += len(data)
+
+    def do_GET(self):
+        state = self.state
+        with state.lock:
+            state.requests += 1
+        if state.check_throttle(self.headers.get("x-api-key")):
+            self._send(429, {"error": "Too Many Requests"}, {"Retry-After": str(state.retry_after)})
+            return
+        delay = state.latency_ms + (random.uniform(0, state.jitter_ms) if state.jitter_ms else 0)
+        time.sleep(delay / 1000.0)
+        if state.error_rate and random.random() < state.error_rate:
+            self._send(500, {"error": "mock error"})
+            return
+
+        parsed = urllib.parse.urlparse(self.path)
+        path = urllib.parse.unquote(parsed.path)
+        query = dict(urllib.parse.parse_qsl(parsed.query))
+
+        fields = query.get("fields")
+        if path.startswith("/graph/v1/paper/search"):
+            paper = state.find_title(query.get("query", ""))
+            self._send(200, {"total": 1 if paper else 0, "data": [_s2_paper(paper, fields)] if paper else []})
+        elif path.startswith("/graph/v1/paper/ARXIV:"):
+            paper = state.papers_by_arxiv.get(path[len("/graph/v1/paper/ARXIV:"):])
+            self._send(200, _s2_paper(paper, fields)) if paper else self._send(404, {"error": "Paper not found"})
+        elif path.startswith("/graph/v1/paper/"):
+            doi = path[len("/graph/v1/paper/"):]
+            doi = doi[4:] if doi.upper().startswith("DOI:") else doi
+            paper = state.papers_by_doi.get(doi.lower())
+            self._send(200, _s2_paper(paper, fields)) if paper else self._send(404, {"error": "Paper not found"})
+        elif path.startswith("/works/"):
+            paper = state.papers_by_doi.get(path[len("/works/"):].lower())
+            self._send(200, {"message": _crossref_item(paper)}) if paper else self._send(404, {"message": "Not found"})
+        elif path.startswith("/works"):
+            filters = query.get("filter", "")
+            if filters.startswith("doi:"):
+                paper = state.papers_by_doi.get(filters[len("doi:"):].lower())
+            else:
+                paper = state.find_title(query.get("query.title", ""))
+            self._send(200, {"message": {"items": [_crossref_item(paper, query.get("select"))] if paper else []}})
+        elif path.startswith("/api/query"):
+            ids = [i for i in query.get("id_list", "").split(",") if i]
+            papers = [state.papers_by_arxiv[i] for i in ids if i in state.papers_by_arxiv]
+            self._send(200, _arxiv_feed(papers), content_type="application/atom+xml")
+        else:
+            self._send(404, {"error": "unknown endpoint"})
+
+
+class MockApiServer:
+    """バックグラウンドスレッドで動くモックサーバー"""
+    def __init__(self, state=None, host="127.0.0.1", port=0):
+        self.state = state or MockState()
+        handler = type("BoundMockHandler", (MockHandler,), {"state": self.state})
+        self.httpd = ThreadingHTTPServer((host, port), handler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 50
+    server = MockApiServer(MockState(latency_ms=latency), port=port)
+    print(f"Mock API: {server.base_url} (latency {latency} ms)")
+    server.httpd.serve_forever()
@@ -1,23 +1,50 @@
 import PyInstaller.__main__
 import llama_cpp
 import os
+import argparse
+from PyQt5.uic import compileUi
+
+# 既定は onedir（フォルダ形式）でビルドする
+#   --onefile は起動のたびに llama_cpp のネイティブライブラリと Qt を一時フォルダへ展開するため、起動が数秒遅くなる
+parser = argparse.ArgumentParser(description="Namecle Windows build")
+parser.add_argument("--onefile", action="store_true", help="従来の単一exe形式でビルドする（配布は楽だが起動が遅い）")
+args = parser.parse_args()
+
+# アプリで使わない Qt モジュール（同梱サイズと展開・読み込み時間の削減）
+QT_EXCLUDES = [
+    "PyQt5.QtWebEngine", "PyQt5.QtWebEngineCore", "PyQt5.QtWebEngineWidgets", "PyQt5.QtWebChannel",
+    "PyQt5.QtWebSockets", "PyQt5.QtQml", "PyQt5.QtQuick", "PyQt5.QtQuickWidgets",
+    "PyQt5.QtMultimedia", "PyQt5.QtMultimediaWidgets", "PyQt5.QtBluetooth", "PyQt5.QtNfc",
+    "PyQt5.QtPositioning", "PyQt5.QtLocation", "PyQt5.QtSensors", "PyQt5.QtSerialPort",
+    "PyQt5.QtSql", "PyQt5.QtTest", "PyQt5.QtDesigner", "PyQt5.QtHelp", "PyQt5.QtOpenGL",
+    "PyQt5.QtXmlPatterns", "PyQt5.QtNetwork", "PyQt5.QtDBus", "PyQt5.Qt3DCore", "PyQt5.uic",
+]
+OTHER_EXCLUDES = ["tkinter", "matplotlib"]
 
 llama_cpp_path = os.path.dirname(llama_cpp.__file__)
 llama_lib_path = os.path.join(llama_cpp_path, 'lib')
 
 print(f"Llama-cpp lib path found: {llama_lib_path}")
 
+# 起動時に .ui を解析しなくて済むよう、画面定義を Python モジュールに変換して同梱する
+with open('namecle_ui.py', 'w', encoding='utf-8') as f:
+    compileUi('Namecle_UI.ui', f)
+print("Compiled Namecle_UI.ui -> namecle_ui.py")
+
 PyInstaller.__main__.run([
     'Namecle_Windows.py',
     '--name=Namecle_Windows',
-    '--onefile',
+    '--onefile' if args.onefile else '--onedir',
     '--windowed',
     '--noconfirm',
+    '--noupx', # UPX 圧縮された DLL は読み込みのたびに展開が必要になり、起動が遅くなる
     '--icon=assets/icon.ico',
     '--splash=assets/social_preview.png',
 
     f'--add-data={llama_lib_path}{os.pathsep}./llama_cpp/lib',
 
     f'--add-data=assets{os.pathsep}assets',
-    f'--add-data=Namecle_UI.ui{os.pathsep}.',
-])
\ No newline at end of file
+    '--hidden-import=namecle_ui',
+] + [f'--exclude-module={m}' for m in QT_EXCLUDES + OTHER_EXCLUDES])
+
+print("Build finished: " + os.path.join("dist", "Namecle_Windows.exe" if args.onefile else os.path.join("Namecle_Windows", "Namecle_Windows.exe")))
@@ -0,0 +1,87 @@
+import re
+import threading
+import xml.etree.ElementTree as ET
+
+# arXiv API (Atom) によるプレプリントの書誌情報取得
+# 複数の ID をまとめて 1 回の id_list クエリで問い合わせる
+DEFAULT_API_URL = "http://export.arxiv.org/api/query"
+BATCH_SIZE = 50
+
+ATOM = "{http://www.w3.org/2005/Atom}"
+ARXIV = "{http://arxiv.org/schemas/atom}"
+_ABS_ID = re.compile(r'arxiv\.org/abs/(?P<id>.+?)(?:v\d+)?$', re.IGNORECASE)
+
+
+def parse_feed(xml_text):
+    """Atom フィードを {arXiv ID(バージョンなし): info} に変換する"""
+    results = {}
+    root = ET.fromstring(xml_text)
+    for entry in root.findall(f"{ATOM}entry"):
+        m = _ABS_ID.search(entry.findtext(f"{ATOM}id", ""))
+        if not m:
+            continue
+        title = " ".join((entry.findtext(f"{ATOM}title") or "").split())
+        if not title or title.lower() == "error":
+            continue
+        published = entry.findtext(f"{ATOM}published") or ""
+        authors = [a.findtext(f"{ATOM}name", "").strip() for a in entry.findall(f"{ATOM}author")]
+        results[m.group("id")] = {
+            "title": title,
+            "authors": ", ".join(a for a in authors if a),
+            "year": int(published[:4]) if published[:4].isdigit() else None,
+            "doi": (entry.findtext(f"{ARXIV}doi") or "").strip() or None,
+            "journal_ref": (entry.findtext(f"{ARXIV}journal_ref") or "").strip() or None,
+            "arxiv_id": m.group("id"),
+        }
+    return results
+
+
+class ArxivResolver:
+    """
+    arXiv ID を書誌情報に解決する
+    want() で先に登録しておいた ID は、次の resolve() の際にまとめて 1 回のリクエストで取得する
+    fetch(url, params) は (HTTP ステータス, 本文) を返す関数
+    """
+    def __init__(self, fetch, api_url=DEFAULT_API_URL, batch_size=BATCH_SIZE):
+        self.fetch = fetch
+        self.api_url = api_url
+        self.batch_size = batch_size
+        self.requests = 0
+        self._results = {}
+        self._pending = []
+        self._lock = threading.Lock()
+        self._fetch_lock = threading.Lock()
+
+    def want(self, arxiv_id):
+        """後でまとめて取得する ID として登録する"""
+        with self._lock:
+            if arxiv_id not in self._results and arxiv_id not in self._pending:
+                self._pending.append(arxiv_id)
+
+    def resolve(self, arxiv_id):
+        """書誌情報の dict を返す。見つからなければ None、通信エラー時は例外（結果は記録しない）"""
+        # arXiv は同時接続を嫌うため、取得は 1 本ずつ行う（待っている間に他のスレッドが取得済みのこともある）
+        with self._fetch_lock:
+            with self._lock:
+                if arxiv_id in self._results:
+                    return self._results[arxiv_id]
+                batch = [arxiv_id] + [i for i in self._pending if i != arxiv_id][:self.batch_size - 1]
+                self._pending = [i for i in self._pending if i not in batch]
+
+            params = {"id_list": ",".join(batch), "max_results": len(batch)}
+            self.requests += 1
+            try:
+                status, text = self.fetch(self.api_url, params)
+                if status != 200:
+                    raise IOError(f"arXiv API エラー: {status}")
+                found = parse_feed(text)
+            except Exception:
+                # 失敗した ID は次回の取得に回す
+                with self._lock:
+                    self._pending.extend(i for i in batch if i != arxiv_id)
+                raise
+
+            with self._lock:
+                for i in batch:
+                    self._results[i] = found.get(i)
+                return self._results[arxiv_id]
@@ -0,0 +1,208 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+# 検索結果キャッシュ（ヒット/ミスで有効期限を分ける）
+DEFAULT_TTL_DAYS = 30
+DEFAULT_NEGATIVE_TTL_DAYS = 3
+
+
+def normalize_query(title=None, doi=None, author=None):
+    """検索条件を正規化してキャッシュキーを作る"""
+    parts = []
+    if doi:
+        d = doi.strip().lower()
+        d = re.sub(r'^(?:https?://(?:dx\.)?doi\.org/|doi:)', '', d)
+        parts.append(f"doi:{d}")
+    if title:
+        parts.append("title:" + re.sub(r'\W+', '', title.lower()))
+    if author:
+        first = author.split(",")[0]
+        parts.append("author:" + re.sub(r'\W+', '', first.lower()))
+    return "|".join(parts)
+
+
+class LookupCache:
+    def __init__(self, path, ttl_days=DEFAULT_TTL_DAYS, negative_ttl_days=DEFAULT_NEGATIVE_TTL_DAYS):
+        self.path = path
+        self.ttl = ttl_days * 86400
+        self.negative_ttl = negative_ttl_days * 86400
+        self._entries = None
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def _load(self):
+        if self._entries is not None:
+            return
+        self._entries = {}
+        if self.path and os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self._entries = json.load(f)
+            except Exception:
+                self._entries = {}
+
+    def get(self, key):
+        """有効なエントリがあれば (hit, result) を返す。なければ None"""
+        if not key:
+            return None
+        with self._lock:
+            self._load()
+            entry = self._entries.get(key)
+            if not entry:
+                return None
+            ttl = self.ttl if entry.get("hit") else self.negative_ttl
+            if time.time() - entry.get("ts", 0) > ttl:
+                del self._entries[key]
+                self._dirty = True
+                return None
+            return entry.get("hit"), entry.get("result")
+
+    def put(self, key, result, hit):
+        if not key:
+            return
+        with self._lock:
+            self._load()
+            self._entries[key] = {"ts": time.time(), "hit": bool(hit), "result": result}
+            self._dirty = True
+
+    def clear(self):
+        with self._lock:
+            self._entries = {}
+            self._dirty = True
+
+    def flush(self):
+        with self._lock:
+            if not self._dirty or self._entries is None or not self.path:
+                return
+            now = time.time()
+            alive = {}
+            for k, e in self._entries.items():
+                ttl = self.ttl if e.get("hit") else self.negative_ttl
+                if now - e.get("ts", 0) <= ttl:
+                    alive[k] = e
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(alive, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+            self._entries = alive
+            self._dirty = False
+
+
+def file_fingerprint(path, head_bytes=1024 * 1024, tail_bytes=64 * 1024, data=None):
+    """
+    ファイル内容の指紋（サイズ・先頭・末尾の SHA-256）
+    ファイル名や場所が変わっても同じ内容なら同じ値になる
+    data に読み込み済みの内容を渡すと、ファイルを読み直さずに同じ値を計算する
+    """
+    h = hashlib.sha256()
+    if data is not None:
+        size = len(data)
+        h.update(str(size).encode())
+        h.update(data[:head_bytes])
+        if size > head_bytes + tail_bytes:
+            h.update(data[-tail_bytes:])
+        elif size > head_bytes:
+            h.update(data[head_bytes:])
+        return h.hexdigest()
+    size = os.path.getsize(path)
+    h.update(str(size).encode())
+    with open(path, "rb") as f:
+        h.update(f.read(head_bytes))
+        if size > head_bytes + tail_bytes:
+            f.seek(-tail_bytes, os.SEEK_END)
+            h.update(f.read(tail_bytes))
+        elif size > head_bytes:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+class TextCache:
+    """指紋をキーにしたテキストキャッシュ（OCR結果など、再計算が高価なもの用）"""
+    def __init__(self, path):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS texts (fingerprint TEXT PRIMARY KEY, text TEXT, ts REAL)"
+            )
+        return self._conn
+
+    def get(self, fingerprint):
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT text FROM texts WHERE fingerprint = ?", (fingerprint,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(self, fingerprint, text):
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO texts (fingerprint, text, ts) VALUES (?, ?, ?)",
+                (fingerprint, text, time.time())
+            )
+            conn.commit()
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class _Flight:
+    __slots__ = ("event", "result", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    同じキーの処理が実行中なら新たに実行せず、その完了を待って結果を共有する
+    （重複したファイルの検索や AI 解析を 1 回にまとめる）
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+        self.shared = 0
+
+    def do(self, key, func):
+        """func() の結果を返す。key が空なら常に実行する"""
+        if not key:
+            return func()
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.shared += 1
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = func()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.event.set()
+        return flight.result
@@ -0,0 +1,221 @@
+import os
+import re
+import sys
+import json
+import time
+import sqlite3
+import threading
+
+# 処理済み論文のカタログ（リネームした結果をファイルの場所とともに記録し、タイトル・著者で検索できるようにする）
+# タイトル・著者は FTS5 の全文検索インデックスに入れるため、ライブラリが大きくてもファイルを探し回らずに済む
+DEFAULT_LIMIT = 200
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS papers (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    fingerprint TEXT,
+    doi TEXT,
+    title TEXT,
+    authors TEXT,
+    year INTEGER,
+    citation_count INTEGER,
+    grade TEXT,
+    provider TEXT,
+    processed_at REAL
+);
+CREATE INDEX IF NOT EXISTS papers_doi ON papers (doi);
+CREATE INDEX IF NOT EXISTS papers_fingerprint ON papers (fingerprint);
+CREATE INDEX IF NOT EXISTS papers_year ON papers (year);
+"""
+
+# papers の内容を参照する外部コンテンツ型の FTS（本文は二重に持たず、トリガーで索引だけを更新する）
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS papers_fts USING fts5(
+    title, authors, content='papers', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS papers_ai AFTER INSERT ON papers BEGIN
+    INSERT INTO papers_fts (rowid, title, authors) VALUES (new.id, new.title, new.authors);
+END;
+CREATE TRIGGER IF NOT EXISTS papers_ad AFTER DELETE ON papers BEGIN
+    INSERT INTO papers_fts (papers_fts, rowid, title, authors) VALUES ('delete', old.id, old.title, old.authors);
+END;
+CREATE TRIGGER IF NOT EXISTS papers_au AFTER UPDATE OF title, authors ON papers BEGIN
+    INSERT INTO papers_fts (papers_fts, rowid, title, authors) VALUES ('delete', old.id, old.title, old.authors);
+    INSERT INTO papers_fts (rowid, title, authors) VALUES (new.id, new.title, new.authors);
+END;
+"""
+
+COLUMNS = ("path", "fingerprint", "doi", "title", "authors", "year", "citation_count", "grade", "provider", "processed_at")
+_TOKEN = re.compile(r'\w+')
+# 語の区切りに空白を使わない文字（かな・漢字・ハングル）。unicode61 では連続した部分が1語になり、途中の語では一致しない
+_UNSEGMENTED = re.compile(r'[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af]')
+
+
+def _key(path):
+    return os.path.normcase(os.path.abspath(path))
+
+
+def fts_query(text):
+    """入力を FTS5 の検索式に変換する（語ごとに前方一致、すべての語を含むもの）"""
+    return " ".join(f'"{t}"*' for t in _TOKEN.findall(text or ""))
+
+
+class Catalog:
+    def __init__(self, path):
+        self.path = path
+        self.fts = True
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def available(self):
+        return bool(self.path) and os.path.exists(self.path)
+
+    def _connect(self):
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            try:
+                conn.executescript(FTS_SCHEMA)
+            except sqlite3.OperationalError:
+                # FTS5 を含まない SQLite では LIKE による検索に切り替える
+                self.fts = False
+            self._conn = conn
+        return self._conn
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def add(self, path, info, fingerprint=None, previous_path=None):
+        """
+        1件を記録する（同じ場所のものは上書き）
+        info は {"title", "authors", "year", "citation_count", "doi", "provider", "グレード"}
+        previous_path を渡すと、リネーム前の場所の記録を取り除く（fingerprint が None なら記録済みの指紋を引き継ぐ）
+        """
+        doi = info.get("doi")
+        row = (
+            _key(path), fingerprint, doi.lower() if doi else None, info.get("title"), info.get("authors"),
+            info.get("year"), info.get("citation_count"), info.get("グレード"), info.get("provider"), time.time()
+        )
+        with self._lock:
+            conn = self._connect()
+            if previous_path and _key(previous_path) != row[0]:
+                if fingerprint is None:
+                    old = conn.execute("SELECT fingerprint FROM papers WHERE path = ?", (_key(previous_path),)).fetchone()
+                    if old:
+                        row = (row[0], old[0]) + row[2:]
+                conn.execute("DELETE FROM papers WHERE path = ?", (_key(previous_path),))
+            conn.execute(
+                f"INSERT INTO papers ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))}) "
+                f"ON CONFLICT(path) DO UPDATE SET {', '.join(f'{c} = excluded.{c}' for c in COLUMNS[2:])}, "
+                "fingerprint = COALESCE(excluded.fingerprint, fingerprint)",
+                row
+            )
+            conn.commit()
+
+    def relocate(self, moves):
+        """ファイルの移動（リネームの取り消しなど）を反映する。moves は [(旧パス, 新パス), ...]"""
+        if not moves or not self.available():
+            return 0
+        with self._lock:
+            conn = self._connect()
+            count = 0
+            for old, new in moves:
+                conn.execute("DELETE FROM papers WHERE path = ?", (_key(new),))
+                count += conn.execute("UPDATE papers SET path = ? WHERE path = ?", (_key(new), _key(old))).rowcount
+            conn.commit()
+        return count
+
+    def _rows(self, sql, params):
+        cur = self._connect().execute(sql, params)
+        names = [d[0] for d in cur.description]
+        return [dict(zip(names, r)) for r in cur.fetchall()]
+
+    def search(self, text, limit=DEFAULT_LIMIT):
+        """タイトル・著者（DOI も可）で検索し、関連度の高い順に dict のリストを返す"""
+        text = (text or "").strip()
+        if not text or not self.available():
+            return []
+        select = f"SELECT {', '.join(COLUMNS)} FROM papers"
+        with self._lock:
+            if text.lower().startswith("10.") and " " not in text:
+                return self._rows(f"{select} WHERE doi = ? LIMIT ?", (text.lower(), limit))
+            query = fts_query(text)
+            rows = []
+            if query and self.fts:
+                rows = self._rows(
+                    f"SELECT {', '.join('p.' + c for c in COLUMNS)} FROM papers_fts f JOIN papers p ON p.id = f.rowid "
+                    f"WHERE papers_fts MATCH ? ORDER BY bm25(papers_fts, 2.0, 1.0), p.citation_count DESC LIMIT ?",
+                    (query, limit)
+                )
+            if not rows and (not self.fts or _UNSEGMENTED.search(text)):
+                # 日本語など語の区切りが無い文字列は前方一致では拾えないため、部分一致で探し直す（索引を使わない全件走査）
+                like = "%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+                rows = self._rows(
+                    f"{select} WHERE title LIKE ? ESCAPE '\\' OR authors LIKE ? ESCAPE '\\' "
+                    f"ORDER BY citation_count DESC LIMIT ?",
+                    (like, like, limit)
+                )
+        return rows
+
+    def count(self):
+        if not self.available():
+            return 0
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM papers").fetchone()[0]
+
+    def prune(self, logger=print):
+        """存在しなくなったファイルの記録を削除する。削除した件数を返す"""
+        if not self.available():
+            return 0
+        with self._lock:
+            conn = self._connect()
+            missing = [(p,) for (p,) in conn.execute("SELECT path FROM papers") if not os.path.exists(p)]
+            conn.executemany("DELETE FROM papers WHERE path = ?", missing)
+            conn.commit()
+        if missing:
+            logger(f"[カタログ] 見つからないファイル {len(missing)} 件を削除しました")
+        return len(missing)
+
+
+def main(argv):
+    if len(argv) < 2 or argv[0] not in ("search", "prune") or (argv[0] == "search" and len(argv) < 3):
+        print("使い方:")
+        print("  python namecle_catalog.py search <catalog.db> <検索語またはDOI> [--limit=N] [--json]")
+        print("  python namecle_catalog.py prune <catalog.db>")
+        return 1
+    catalog = Catalog(argv[1])
+    if not catalog.available():
+        print(f"カタログがありません: {argv[1]}")
+        return 1
+    if argv[0] == "prune":
+        removed = catalog.prune()
+        print(f"[カタログ] {catalog.count()} 件（{removed} 件削除）")
+    else:
+        limit = DEFAULT_LIMIT
+        words = []
+        for arg in argv[2:]:
+            if arg.startswith("--limit="):
+                limit = int(arg.split("=", 1)[1])
+            elif arg != "--json":
+                words.append(arg)
+        rows = catalog.search(" ".join(words), limit)
+        if "--json" in argv:
+            print(json.dumps(rows, ensure_ascii=False, indent=2))
+        elif not rows:
+            print("見つかりませんでした。")
+        else:
+            for row in rows:
+                print(f"{row['year'] or '----'} {row['grade'] or '---'} {row['title']} / {row['authors'] or ''}")
+                print(f"    {row['path']}")
+    catalog.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
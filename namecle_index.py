@@ -0,0 +1,208 @@
+import os
+import re
+import sys
+import json
+import sqlite3
+import difflib
+import threading
+
+# オフライン書誌インデックス（CrossRef / Semantic Scholar の JSONL スナップショットから作成）
+TITLE_MATCH_THRESHOLD = 0.9 # タイトル一致と見なす最小類似度
+MAX_CANDIDATES = 20 # トライグラムで絞り込む候補数
+MAX_QUERY_TRIGRAMS = 200
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS papers (
+    id INTEGER PRIMARY KEY,
+    doi TEXT UNIQUE,
+    title TEXT,
+    norm_title TEXT,
+    authors TEXT,
+    year INTEGER,
+    citation_count INTEGER
+);
+CREATE INDEX IF NOT EXISTS papers_norm_title ON papers (norm_title);
+CREATE TABLE IF NOT EXISTS trigrams (
+    tri TEXT NOT NULL,
+    paper_id INTEGER NOT NULL,
+    PRIMARY KEY (tri, paper_id)
+) WITHOUT ROWID;
+"""
+
+
+def normalize_title(title):
+    return re.sub(r'\W+', '', (title or "").lower())
+
+
+def title_trigrams(norm_title):
+    return {norm_title[i:i + 3] for i in range(len(norm_title) - 2)}
+
+
+def parse_record(obj):
+    """スナップショットの1レコードを共通形式に変換する（CrossRef/Semantic Scholar 両対応）"""
+    if "externalIds" in obj or "citationCount" in obj or "paperId" in obj:
+        doi = (obj.get("externalIds") or {}).get("DOI") or obj.get("doi")
+        authors = ", ".join(a.get("name", "") for a in obj.get("authors") or [])
+        return doi, obj.get("title"), authors, obj.get("year"), obj.get("citationCount")
+
+    title = obj.get("title")
+    if isinstance(title, list):
+        title = title[0] if title else None
+    date_parts = (obj.get("issued") or {}).get("date-parts") or [[None]]
+    year = date_parts[0][0] if date_parts and date_parts[0] else None
+    authors = ", ".join(
+        f"{a.get('given','')} {a.get('family','')}".strip() for a in obj.get("author") or []
+    )
+    return obj.get("DOI"), title, authors, year, obj.get("is-referenced-by-count")
+
+
+class OfflineIndex:
+    def __init__(self, path):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def available(self):
+        return bool(self.path) and os.path.exists(self.path)
+
+    def _connect(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def import_jsonl(self, jsonl_path, logger=print, batch_size=5000):
+        """JSONL スナップショットを取り込む。取り込んだ件数を返す"""
+        count = 0
+        with self._lock:
+            conn = self._connect()
+            cur = conn.cursor()
+            with open(jsonl_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        doi, title, authors, year, c_count = parse_record(json.loads(line))
+                    except Exception:
+                        continue
+                    if not title:
+                        continue
+                    doi = doi.lower() if doi else None
+                    norm = normalize_title(title)
+                    if doi:
+                        row = cur.execute("SELECT id FROM papers WHERE doi = ?", (doi,)).fetchone()
+                    else:
+                        # DOI の無いレコードは同じタイトル・発行年のものを同一とみなす（再取り込みで重複させない）
+                        row = cur.execute(
+                            "SELECT id FROM papers WHERE doi IS NULL AND norm_title = ? AND year IS ?", (norm, year)
+                        ).fetchone()
+                    if row:
+                        # 既存のレコードは新しいスナップショットの内容で上書きする（古いタイトルのトライグラムは削除）
+                        paper_id = row[0]
+                        cur.execute(
+                            "UPDATE papers SET title = ?, norm_title = ?, authors = ?, year = ?, citation_count = ? WHERE id = ?",
+                            (title, norm, authors, year, c_count, paper_id)
+                        )
+                        cur.execute("DELETE FROM trigrams WHERE paper_id = ?", (paper_id,))
+                    else:
+                        cur.execute(
+                            "INSERT INTO papers (doi, title, norm_title, authors, year, citation_count) VALUES (?, ?, ?, ?, ?, ?)",
+                            (doi, title, norm, authors, year, c_count)
+                        )
+                        paper_id = cur.lastrowid
+                    cur.executemany(
+                        "INSERT OR IGNORE INTO trigrams (tri, paper_id) VALUES (?, ?)",
+                        [(t, paper_id) for t in title_trigrams(norm)]
+                    )
+                    count += 1
+                    if count % batch_size == 0:
+                        conn.commit()
+                        logger(f"[インデックス] {count} 件取り込み済み")
+            conn.commit()
+        return count
+
+    def _row_to_result(self, row):
+        _, title, authors, year, c_count = row
+        info = {"title": title, "authors": authors, "year": year, "citation_count": c_count, "provider": "offline_index"}
+        return c_count, year, authors, info
+
+    def lookup_doi(self, doi):
+        if not doi or not self.available():
+            return None
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT id, title, authors, year, citation_count FROM papers WHERE doi = ?",
+                (doi.strip().lower(),)
+            ).fetchone()
+        return self._row_to_result(row) if row else None
+
+    def lookup_title(self, title, author=None):
+        if not title or not self.available():
+            return None
+        norm = normalize_title(title)
+        tris = list(title_trigrams(norm))[:MAX_QUERY_TRIGRAMS]
+        if not tris:
+            return None
+        placeholders = ",".join("?" * len(tris))
+        with self._lock:
+            conn = self._connect()
+            ids = [r[0] for r in conn.execute(
+                f"SELECT paper_id FROM trigrams WHERE tri IN ({placeholders}) "
+                f"GROUP BY paper_id ORDER BY COUNT(*) DESC LIMIT {MAX_CANDIDATES}",
+                tris
+            )]
+            if not ids:
+                return None
+            rows = conn.execute(
+                f"SELECT id, title, authors, year, citation_count, norm_title FROM papers WHERE id IN ({','.join('?' * len(ids))})",
+                ids
+            ).fetchall()
+
+        first_author = normalize_title(author.split(",")[0]) if author else ""
+        best, best_score = None, 0.0
+        for row in rows:
+            score = difflib.SequenceMatcher(None, norm, row[5]).ratio()
+            if first_author and first_author in normalize_title(row[2]):
+                score += 0.05
+            if score > best_score:
+                best, best_score = row, score
+        if best is None or best_score < TITLE_MATCH_THRESHOLD:
+            return None
+        return self._row_to_result(best[:5])
+
+    def lookup(self, title=None, doi=None, author=None):
+        res = self.lookup_doi(doi) if doi else None
+        if not res and title:
+            res = self.lookup_title(title, author)
+        return res
+
+
+def main(argv):
+    if len(argv) < 3 or argv[0] not in ("import", "lookup"):
+        print("使い方:")
+        print("  python namecle_index.py import <index.db> <snapshot.jsonl> [...]")
+        print("  python namecle_index.py lookup <index.db> <DOIまたはタイトル>")
+        return 1
+    index = OfflineIndex(argv[1])
+    if argv[0] == "import":
+        total = 0
+        for path in argv[2:]:
+            total += index.import_jsonl(path)
+        print(f"[インデックス] 取り込み完了: {total} 件")
+    else:
+        query = " ".join(argv[2:])
+        res = index.lookup(doi=query) if query.startswith("10.") else index.lookup(title=query)
+        print(json.dumps(res[3], ensure_ascii=False, indent=2) if res else "見つかりませんでした。")
+    index.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,211 @@
+import os
+import re
+import xml.etree.ElementTree as ET
+
+from namecle_scan import find_doi, YEAR_REGEX
+
+# PDF 埋め込みメタデータ（XMP / Info 辞書）からの書誌情報の取得
+# ページの内容を解析せずに済むため速いが、作成ソフトが入れた値（"Microsoft Word - draft.docx" など）も多いので、
+# タイトル・著者ごとに信頼度を付け、十分に信頼できる場合だけ使う
+
+RDF = "{http://www.w3.org/1999/02/22-rdf-syntax-ns#}"
+# 名前空間 URI の一部 -> 接頭辞（prism などは版によって URI が異なる）
+NAMESPACES = (
+    ("purl.org/dc/elements", "dc"),
+    ("prismstandard.org", "prism"),
+    ("ns.adobe.com/pdfx", "pdfx"),
+    ("crossref.org/crossmark", "crossmark"),
+    ("ns.adobe.com/xap/1.0/", "xmp"),
+    ("ns.adobe.com/pdf/1.3/", "pdf"),
+)
+DOI_KEYS = ("prism:doi", "pdfx:doi", "crossmark:DOI", "pdfx:WPS-ARTICLEDOI", "dc:identifier", "prism:url")
+DATE_KEYS = ("prism:publicationDate", "prism:coverDate", "prism:coverDisplayDate", "dc:date")
+MIN_SCORE = 0.85 # これ以上なら本文の解析・AI 解析を省略する
+
+JUNK_TITLE_PATTERNS = [re.compile(p, re.IGNORECASE) for p in (
+    r'^microsoft\s+(word|powerpoint|excel)\b',
+    r'\.(docx?|pdf|tex|dvi|ps|eps|indd|qxd|rtf|odt|pages)\s*$',
+    r'^(untitled|document|doc|slide|layout|job|book|draft|manuscript|template)[\s\-_]*\d*$',
+    r'^(title|no title|none|null|unknown|abstract|paper|article|presentation|powerpoint presentation|print|preface|contents|cover)$',
+    r'^(doi:|https?://|www\.|arxiv:)',
+    r'^[^\s]+_[^\s]+$',          # 空白を含まない "ACS_JPCA_2020_123" のような識別子
+    r'^[A-Z]?[\d\-().\s]+[A-Z]?$', # 数字と記号だけ（PII・論文番号など）
+    r'\\[a-z]+|\$',              # LaTeX のマクロが残ったもの
+)]
+JUNK_AUTHOR_PATTERN = re.compile(
+    r'^(admin(istrator)?|user|owner|author|authors?|unknown|anonymous|microsoft|default|guest|staff|editor|editors|'
+    r'ieee|elsevier|springer|wiley|acs|aps|iop|pc|tex|latex|windows user|dell|lenovo|hp)$',
+    re.IGNORECASE
+)
+_WORD = re.compile(r'[^\W\d_]{2,}')
+_YEAR = re.compile(YEAR_REGEX)
+
+
+def _prefix(namespace):
+    for fragment, prefix in NAMESPACES:
+        if fragment in namespace:
+            return prefix
+    return None
+
+
+def _split_tag(tag):
+    if tag.startswith("{"):
+        namespace, _, local = tag[1:].partition("}")
+        return namespace, local
+    return "", tag
+
+
+def parse_xmp(xml_text):
+    """XMP パケットを {"dc:title": [...], "prism:doi": "...", ...} に変換する（最初に出てきた値を使う）"""
+    values = {}
+    if not xml_text or not xml_text.strip():
+        return values
+    try:
+        root = ET.fromstring(xml_text.strip())
+    except ET.ParseError:
+        return values
+
+    def put(key, value):
+        if value and key not in values:
+            values[key] = value
+
+    for el in root.iter():
+        # 値が属性として書かれている場合（<rdf:Description prism:doi="..."/>）
+        for attr, value in el.attrib.items():
+            namespace, local = _split_tag(attr)
+            prefix = _prefix(namespace)
+            if prefix and value.strip():
+                put(f"{prefix}:{local}", value.strip())
+        namespace, local = _split_tag(el.tag)
+        prefix = _prefix(namespace)
+        if not prefix:
+            continue
+        items = [li.text.strip() for li in el.iter(f"{RDF}li") if li.text and li.text.strip()]
+        if items:
+            put(f"{prefix}:{local}", items)
+        elif el.text and el.text.strip():
+            put(f"{prefix}:{local}", el.text.strip())
+    return values
+
+
+def _first(value):
+    if isinstance(value, list):
+        return value[0] if value else None
+    return value
+
+
+def _normalize(s):
+    return re.sub(r'\W+', '', (s or "").lower())
+
+
+def score_title(title, pdf_path=None, min_title_length=5):
+    """タイトルらしさ (0.0〜1.0)"""
+    title = " ".join((title or "").split())
+    if len(title) <= min_title_length or len(title) > 300:
+        return 0.0
+    if any(p.search(title) for p in JUNK_TITLE_PATTERNS):
+        return 0.0
+    if len(_WORD.findall(title)) < 3:
+        return 0.2
+    if pdf_path and _normalize(title) == _normalize(os.path.splitext(os.path.basename(pdf_path))[0]):
+        # ファイル名をそのまま入れただけのもの
+        return 0.3
+    return 1.0
+
+
+def _valid_name(name):
+    name = name.strip(" .;")
+    if not name or "@" in name or any(c.isdigit() for c in name) or JUNK_AUTHOR_PATTERN.match(name):
+        return None
+    parts = [p for p in re.split(r'[\s.]+', name) if p]
+    # 姓と名（またはイニシャル）の両方があるものだけを人名とみなす（"jsmith" のようなユーザー名を除く）
+    if len(parts) < 2 or not any(len(p) > 1 for p in parts):
+        return None
+    return name
+
+
+def split_authors(value):
+    """著者欄を人名のリストに分け、人名らしくないものを除く。(名前のリスト, 除外した数) を返す"""
+    if isinstance(value, list):
+        raw = value
+    elif value:
+        sep = ";" if ";" in value else ","
+        raw = [p for part in value.split(sep) for p in re.split(r'\s+and\s+|\s*&\s*', part)]
+        # "Smith, John" の形式（カンマ区切りで1語ずつ）は1人分として扱う
+        if sep == "," and len(raw) == 2 and all(len(p.split()) == 1 for p in raw):
+            raw = [" ".join(reversed([p.strip() for p in raw]))]
+    else:
+        raw = []
+    names, rejected = [], 0
+    for name in raw:
+        valid = _valid_name(name)
+        if valid:
+            names.append(valid)
+        else:
+            rejected += 1
+    return names, rejected
+
+
+def extract_metadata(info, xmp_text=None, pdf_path=None, max_authors=5, min_title_length=5):
+    """
+    Info 辞書（PyMuPDF の doc.metadata）と XMP から書誌情報を取り出し、信頼度を付けて返す
+    {"title", "authors", "year", "doi", "score", "source"}。使える値が無ければ None
+    """
+    info = info or {}
+    xmp = parse_xmp(xmp_text)
+
+    title, title_score, source = None, 0.0, None
+    for candidate, origin in ((_first(xmp.get("dc:title")), "xmp"), (info.get("title"), "info")):
+        score = score_title(candidate, pdf_path, min_title_length)
+        if score > title_score:
+            title, title_score, source = " ".join(candidate.split()), score, origin
+
+    authors, author_score = None, 0.0
+    for candidate in (xmp.get("dc:creator"), info.get("author")):
+        names, rejected = split_authors(candidate)
+        if names:
+            authors = ", ".join(names[:max_authors])
+            author_score = 1.0 if not rejected else 0.5
+            break
+
+    doi, doi_trusted = None, False
+    for text in [_first(xmp.get(k)) for k in DOI_KEYS]:
+        doi = find_doi(text) if isinstance(text, str) else None
+        if doi:
+            doi_trusted = True
+            break
+    else:
+        # Info の subject / keywords には引用文献の DOI が入っていることもあるため、それだけでは信頼しない
+        for text in (info.get("subject"), info.get("keywords")):
+            doi = find_doi(text) if isinstance(text, str) else None
+            if doi:
+                break
+
+    year = None
+    for text in [_first(xmp.get(k)) for k in DATE_KEYS]:
+        m = _YEAR.search(text) if isinstance(text, str) else None
+        if m:
+            year = int(m.group("year"))
+            break
+
+    if not (title or doi):
+        return None
+    score = 0.5 * title_score + 0.4 * author_score + (0.1 if year else 0.0)
+    if doi_trusted:
+        # XMP の DOI 欄の値は API で検証されるため、それだけで十分な手掛かりになる
+        score, source = 1.0, source or "xmp"
+    return {"title": title, "authors": authors, "year": year, "doi": doi, "score": round(score, 2), "source": source}
+
+
+def trusted(meta, min_score=MIN_SCORE):
+    """本文の解析を省略してよいか（信頼度が十分で、タイトルがあるもの）"""
+    return bool(meta) and meta["score"] >= min_score and bool(meta["title"])
+
+
+def read_metadata(doc, pdf_path=None, max_authors=5, min_title_length=5):
+    """開いた PDF（fitz.Document）の埋め込みメタデータを extract_metadata で評価する"""
+    try:
+        xmp_text = doc.get_xml_metadata()
+    except Exception:
+        xmp_text = None
+    return extract_metadata(doc.metadata, xmp_text, pdf_path, max_authors, min_title_length)
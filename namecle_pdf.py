@@ -0,0 +1,561 @@
+import os
+import sys
+import time
+import queue
+import threading
+import itertools
+import subprocess
+import multiprocessing
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from namecle_scan import scan_text, find_arxiv_id, arxiv_id_from_filename
+from namecle_cache import TextCache, file_fingerprint
+from namecle_meta import read_metadata, trusted
+
+# PDF 解析（サンドボックス化した子プロセスで並列実行する）
+
+# 1ファイルあたりの解析予算。超えた場合はファイル名のみで処理する
+DEFAULT_BUDGET = {
+    "max_file_mb": 200,       # これより大きいファイルは開かない
+    "max_pages": 2000,        # これより多いページ数の PDF は1ページ目のみ解析
+    "max_text_chars": 200000, # 抽出するテキストの最大文字数
+    "timeout_sec": 30,        # 1ファイルあたりの解析時間上限
+    "memory_mb": 1024,        # 解析プロセスのメモリ上限
+}
+
+MIN_TEXT_CHARS = 50 # これ未満のテキストしか取れない場合は画像のみのPDFと見なす
+
+# OCR 設定の既定値（Tesseract が必要）
+DEFAULT_OCR = {
+    "enabled": False,
+    "language": "eng",
+    "dpi": 300,
+    "top_ratio": 0.4, # 1ページ目の上から何割を OCR するか
+    "cache_path": None,
+}
+
+# ネットワークドライブ上の PDF を先読みする設定（files: 先読みするファイル数, 0 で無効）
+DEFAULT_READ_AHEAD = {
+    "files": 8,
+    "threads": 4,
+    "max_mb": 256,     # 先読みして未使用のバッファの合計上限
+    "max_file_mb": 64, # これより大きいファイルは先読みせず、直接開く
+}
+
+_text_caches = {}
+
+
+def empty_record(pdf_path, error=None, degraded=None):
+    return {
+        "path": pdf_path, "doi": None, "arxiv": None, "title": None, "authors": None, "year": None,
+        "error": error, "degraded": degraded, "ocr_text": None, "metadata": None, "timings": {}
+    }
+
+
+def check_budget(pdf_path, budget=None, size=None):
+    """ファイルを開く前にサイズ上限を確認し、超えていれば理由を返す"""
+    budget = budget or DEFAULT_BUDGET
+    try:
+        if size is None:
+            size = os.path.getsize(pdf_path)
+    except OSError as e:
+        return f"ファイルにアクセスできません: {e}"
+    if size > budget["max_file_mb"] * 1024 * 1024:
+        return f"ファイルサイズ上限超過 ({size // (1024 * 1024)} MB)"
+    return None
+
+
+def open_pdf_guarded(pdf_path, budget=None, data=None):
+    """
+    予算内であれば PDF を開いて (doc, 解析するページ数の上限) を返す
+    開けない場合は (None, 理由) を返す
+    data に先読み済みの内容を渡すと、ファイルではなくメモリ上から開く
+    """
+    budget = budget or DEFAULT_BUDGET
+    reason = check_budget(pdf_path, budget, None if data is None else len(data))
+    if reason:
+        return None, reason
+    try:
+        import fitz  # PyMuPDF は読み込みが重いため、最初に PDF を開くときに読み込む
+        doc = fitz.open(pdf_path) if data is None else fitz.open(stream=data, filetype="pdf")
+    except Exception as e:
+        return None, f"PDF読み込みエラー: {e}"
+    if doc.needs_pass:
+        doc.close()
+        return None, "パスワード保護されたPDFです"
+    page_limit = 1 if len(doc) > budget["max_pages"] else None
+    return doc, page_limit
+
+
+def ocr_top_region(doc, ocr):
+    """1ページ目の上部だけを画像化して OCR する"""
+    import fitz
+    page = doc[0]
+    rect = page.rect
+    clip = fitz.Rect(rect.x0, rect.y0, rect.x1, rect.y0 + rect.height * ocr["top_ratio"])
+    pix = page.get_pixmap(dpi=ocr["dpi"], clip=clip)
+    pdf_bytes = pix.pdfocr_tobytes(language=ocr["language"])
+    with fitz.open("pdf", pdf_bytes) as ocr_doc:
+        return ocr_doc[0].get_text()
+
+
+def cached_ocr_text(pdf_path, doc, ocr, data=None):
+    """OCR 結果をファイル内容の指紋でキャッシュし、同じファイルは二度と OCR しない"""
+    cache = None
+    fingerprint = None
+    if ocr.get("cache_path"):
+        cache = _text_caches.get(ocr["cache_path"])
+        if cache is None:
+            cache = _text_caches[ocr["cache_path"]] = TextCache(ocr["cache_path"])
+        try:
+            fingerprint = file_fingerprint(pdf_path, data=data)
+            text = cache.get(fingerprint)
+            if text is not None:
+                return text
+        except Exception:
+            cache = None
+
+    try:
+        text = ocr_top_region(doc, ocr)
+    except Exception:
+        # Tesseract が無い場合など。失敗はキャッシュしない
+        return ""
+
+    if cache is not None:
+        try:
+            cache.put(fingerprint, text)
+        except Exception:
+            pass
+    return text
+
+
+def _title_from_lines(text, min_title_length):
+    for line in text.splitlines():
+        line = line.strip()
+        if len(line) > min_title_length and any(c.isalpha() for c in line):
+            return line
+    return None
+
+
+def parse_pdf(pdf_path, preview_pages=5, title_font_threshold=15, min_title_length=5, max_authors=5, budget=None, ocr=None,
+              metadata_min_score=None, data=None):
+    """
+    PDF を1回だけ開き、DOI・タイトル・著者・発行年をまとめて抽出する
+    プロセス間で受け渡せるよう、結果は小さな dict で返す
+    metadata_min_score を指定すると、埋め込みメタデータの信頼度がそれ以上でタイトルもある場合は本文を解析しない
+    data は先読み済みのファイル内容（None ならファイルから読む）
+    """
+    budget = budget or DEFAULT_BUDGET
+    record = empty_record(pdf_path)
+    # 子プロセスでの段階別所要時間（秒）も record に載せて返す
+    timings = record["timings"]
+    t0 = time.perf_counter()
+    doc, page_limit = open_pdf_guarded(pdf_path, budget, data)
+    timings["open"] = time.perf_counter() - t0
+    if doc is None:
+        record["error"], record["degraded"] = page_limit, "open"
+        return record
+
+    try:
+        meta = None
+        if metadata_min_score is not None:
+            t0 = time.perf_counter()
+            meta = read_metadata(doc, pdf_path, max_authors, min_title_length)
+            timings["metadata"] = time.perf_counter() - t0
+            if trusted(meta, metadata_min_score):
+                record["title"], record["authors"], record["year"], record["doi"] = meta["title"], meta["authors"], meta["year"], meta["doi"]
+                record["metadata"] = meta["source"]
+                if not meta["doi"]:
+                    record["arxiv"] = arxiv_id_from_filename(pdf_path)
+                return record
+
+        t0 = time.perf_counter()
+        if len(doc) > 0:
+            for block in doc[0].get_text("dict")["blocks"]:
+                for line in block.get("lines", []):
+                    for span in line["spans"]:
+                        if span["size"] > title_font_threshold and len(span["text"].strip()) > min_title_length:
+                            record["title"] = span["text"].strip(); break
+                    if record["title"]: break
+                if record["title"]: break
+
+        parts, length = [], 0
+        for page in doc[:page_limit or preview_pages]:
+            page_text = page.get_text()
+            parts.append(page_text)
+            length += len(page_text)
+            if length >= budget["max_text_chars"]:
+                break
+        text = "".join(parts)[:budget["max_text_chars"]]
+        timings["text"] = time.perf_counter() - t0
+
+        if ocr and ocr.get("enabled") and len(text.strip()) < MIN_TEXT_CHARS and len(doc) > 0:
+            t0 = time.perf_counter()
+            ocr_text = cached_ocr_text(pdf_path, doc, ocr, data)
+            timings["ocr"] = time.perf_counter() - t0
+            if ocr_text.strip():
+                record["ocr_text"] = ocr_text
+                text = ocr_text
+                if not record["title"]:
+                    record["title"] = _title_from_lines(ocr_text, min_title_length)
+
+        t0 = time.perf_counter()
+        doi, year, authors = scan_text(text, max_authors)
+        if not doi and meta and meta["score"] >= metadata_min_score:
+            # タイトルの無いメタデータでも、XMP の DOI は使う
+            doi = meta["doi"]
+        if not doi:
+            record["arxiv"] = find_arxiv_id(text) or arxiv_id_from_filename(pdf_path)
+        timings["doi_scan"] = time.perf_counter() - t0
+        record["doi"], record["year"], record["authors"] = doi, year, ", ".join(authors)
+    except MemoryError:
+        raise
+    except Exception as e:
+        record["error"], record["degraded"] = f"PDF解析エラー: {e}", "parse"
+    finally:
+        doc.close()
+    return record
+
+
+def _apply_memory_limit(memory_mb):
+    """解析プロセス自身のメモリ使用量に上限を設定する"""
+    if not memory_mb:
+        return
+    limit = memory_mb * 1024 * 1024
+    if sys.platform == "win32":
+        _apply_job_memory_limit(limit)
+        return
+    try:
+        import resource
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except Exception:
+        pass
+
+
+def _apply_job_memory_limit(limit):
+    # Windows ではジョブオブジェクトでプロセスのメモリ上限を設定する
+    try:
+        import ctypes
+        from ctypes import wintypes
+
+        class IO_COUNTERS(ctypes.Structure):
+            _fields_ = [(name, ctypes.c_ulonglong) for name in (
+                "ReadOperationCount", "WriteOperationCount", "OtherOperationCount",
+                "ReadTransferCount", "WriteTransferCount", "OtherTransferCount"
+            )]
+
+        class JOBOBJECT_BASIC_LIMIT_INFORMATION(ctypes.Structure):
+            _fields_ = [
+                ("PerProcessUserTimeLimit", ctypes.c_int64),
+                ("PerJobUserTimeLimit", ctypes.c_int64),
+                ("LimitFlags", wintypes.DWORD),
+                ("MinimumWorkingSetSize", ctypes.c_size_t),
+                ("MaximumWorkingSetSize", ctypes.c_size_t),
+                ("ActiveProcessLimit", wintypes.DWORD),
+                ("Affinity", ctypes.c_size_t),
+                ("PriorityClass", wintypes.DWORD),
+                ("SchedulingClass", wintypes.DWORD),
+            ]
+
+        class JOBOBJECT_EXTENDED_LIMIT_INFORMATION(ctypes.Structure):
+            _fields_ = [
+                ("BasicLimitInformation", JOBOBJECT_BASIC_LIMIT_INFORMATION),
+                ("IoInfo", IO_COUNTERS),
+                ("ProcessMemoryLimit", ctypes.c_size_t),
+                ("JobMemoryLimit", ctypes.c_size_t),
+                ("PeakProcessMemoryUsed", ctypes.c_size_t),
+                ("PeakJobMemoryUsed", ctypes.c_size_t),
+            ]
+
+        JOB_OBJECT_LIMIT_PROCESS_MEMORY = 0x100
+        JobObjectExtendedLimitInformation = 9
+
+        kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+        kernel32.CreateJobObjectW.restype = wintypes.HANDLE
+        kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+        job = kernel32.CreateJobObjectW(None, None)
+        if not job:
+            return
+        info = JOBOBJECT_EXTENDED_LIMIT_INFORMATION()
+        info.BasicLimitInformation.LimitFlags = JOB_OBJECT_LIMIT_PROCESS_MEMORY
+        info.ProcessMemoryLimit = limit
+        kernel32.SetInformationJobObject(
+            wintypes.HANDLE(job), JobObjectExtendedLimitInformation,
+            ctypes.byref(info), ctypes.sizeof(info)
+        )
+        kernel32.AssignProcessToJobObject(wintypes.HANDLE(job), wintypes.HANDLE(kernel32.GetCurrentProcess()))
+    except Exception:
+        pass
+
+
+def _sandbox_main(conn, memory_mb):
+    _apply_memory_limit(memory_mb)
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, OSError):
+            break
+        if job is None:
+            break
+        try:
+            record = parse_pdf(*job)
+        except MemoryError:
+            record = empty_record(job[0], "メモリ上限超過", "memory")
+        except Exception as e:
+            record = empty_record(job[0], f"PDF解析エラー: {e}", "parse")
+        conn.send(record)
+
+
+def _sandbox_command():
+    """解析用の子プロセスの起動コマンド（GUI 本体ではなく namecle_sandbox から起動する）"""
+    from namecle_sandbox import ARG
+    if getattr(sys, "frozen", False):
+        # exe 版は同じ exe を起動し、GUI のモジュールを読み込む前に namecle_sandbox へ処理を移す
+        return [sys.executable, ARG]
+    return [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "namecle_sandbox.py")]
+
+
+class SandboxWorker:
+    """
+    メモリ上限付きの子プロセスで PDF を解析する
+    時間切れや異常終了した場合はプロセスを破棄し、次の呼び出しで起動し直す
+    """
+    def __init__(self, budget=None):
+        self.budget = budget or DEFAULT_BUDGET
+        self._proc = None
+        self._conn = None
+        self._child_conn = None
+
+    def _start(self):
+        # multiprocessing の spawn は子プロセスで親の __main__（GUI 本体）を読み込み直すため、
+        # 専用の入口 (namecle_sandbox) を subprocess で起動し、パイプだけを引き継ぐ
+        self._conn, child_conn = multiprocessing.Pipe()
+        args = [str(self.budget["memory_mb"] or 0)]
+        if sys.platform == "win32":
+            # 子プロセスが親のハンドルを複製して使う（複製されるまでは親側で閉じない）
+            args = [str(os.getpid()), str(child_conn.fileno())] + args
+            self._proc = subprocess.Popen(_sandbox_command() + args, creationflags=subprocess.CREATE_NO_WINDOW)
+            self._child_conn = child_conn
+        else:
+            args = [str(child_conn.fileno())] + args
+            self._proc = subprocess.Popen(_sandbox_command() + args, pass_fds=(child_conn.fileno(),))
+            child_conn.close()
+
+    def _wait(self, timeout):
+        """応答を待つ。子プロセスが終了した場合は時間切れを待たずに EOFError"""
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if self._conn.poll(max(0.0, min(remaining, 0.2))):
+                return True
+            if self._proc.poll() is not None:
+                raise EOFError
+            if remaining <= 0:
+                return False
+
+    def parse(self, job):
+        """job は parse_pdf の引数のタプル（最後の要素は先読み済みの内容または None）"""
+        pdf_path, data = job[0], job[-1]
+        reason = check_budget(pdf_path, self.budget, None if data is None else len(data))
+        if reason:
+            return empty_record(pdf_path, reason, "size")
+
+        if self._proc is None or self._proc.poll() is not None:
+            self.close()
+            self._start()
+        try:
+            self._conn.send(job)
+            if self._wait(self.budget["timeout_sec"]):
+                return self._conn.recv()
+            reason, kind = f"解析時間上限超過 ({self.budget['timeout_sec']}秒)", "timeout"
+        except (EOFError, OSError):
+            reason, kind = "解析プロセスが異常終了しました (メモリ上限超過の可能性)", "crash"
+        self.close()
+        return empty_record(pdf_path, reason, kind)
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+        if self._child_conn is not None:
+            self._child_conn.close()
+            self._child_conn = None
+        if self._proc is not None:
+            if self._proc.poll() is None:
+                self._proc.kill()
+            try:
+                self._proc.wait(1)
+            except subprocess.TimeoutExpired:
+                pass
+            self._proc = None
+
+
+WINDOW_PER_WORKER = 4 # ParsePool が先行して解析に回すファイル数（プロセスあたり）
+
+
+class ParsePool:
+    """
+    PDF 解析をサンドボックス化したプロセス群に分散し、入力順に結果を返す
+    先読みする件数を制限して、大量のファイルでもメモリを圧迫しないようにする
+    read_ahead (ReadAhead) を渡すと、先読み済みの内容を子プロセスに渡してファイルを読み直さない
+    keep_data が True なら、DOI の見つからなかったファイルの内容を record["data"] に残す（親プロセスの AI 解析で再度開く場合用）
+    """
+    def __init__(self, workers=None, preview_pages=5, title_font_threshold=15, min_title_length=5, max_authors=5, budget=None, ocr=None,
+                 metadata_min_score=None, read_ahead=None, keep_data=False):
+        self.workers = workers or os.cpu_count() or 1
+        self.budget = budget or DEFAULT_BUDGET
+        self.options = (preview_pages, title_font_threshold, min_title_length, max_authors, self.budget, ocr, metadata_min_score)
+        self.read_ahead = read_ahead
+        self.keep_data = keep_data
+        self.window = self.workers * WINDOW_PER_WORKER
+        self._executor = None
+        self._sandboxes = []
+        self._idle = queue.Queue()
+
+    def __enter__(self):
+        self._executor = ThreadPoolExecutor(max_workers=self.workers)
+        for _ in range(self.workers):
+            sandbox = SandboxWorker(self.budget)
+            self._sandboxes.append(sandbox)
+            self._idle.put(sandbox)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.shutdown()
+
+    def shutdown(self):
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        for sandbox in self._sandboxes:
+            sandbox.close()
+        self._sandboxes = []
+
+    def _parse(self, path):
+        data = self.read_ahead.take(path) if self.read_ahead else None
+        sandbox = self._idle.get()
+        try:
+            record = sandbox.parse((path,) + self.options + (data,))
+        finally:
+            self._idle.put(sandbox)
+        if self.keep_data and data is not None and not record.get("degraded") and not record.get("doi") and not record.get("metadata"):
+            record["data"] = data
+        return record
+
+    def imap(self, paths):
+        pending = deque()
+        paths = iter(paths)
+        for path in paths:
+            pending.append((path, self._executor.submit(self._parse, path)))
+            if len(pending) >= self.window:
+                break
+        while pending:
+            path, future = pending.popleft()
+            next_path = next(paths, None)
+            if next_path is not None:
+                pending.append((next_path, self._executor.submit(self._parse, next_path)))
+            try:
+                yield future.result()
+            except Exception as e:
+                yield empty_record(path, str(e), "crash")
+
+
+class ReadAhead:
+    """
+    これから解析するファイルを、バックグラウンドのスレッドで順にメモリへ読み込んでおく
+    ネットワークドライブ上のファイルでも、読み込み待ちと解析・AI 処理を重ねて実行できる
+    take() で受け取っていないバッファの合計は max_mb までに抑える（受け取った順に解放される）
+    並列に受け取る場合は、同時に受け取るスレッド数以上の files を指定する（先読みより先に要求されたファイルは先読みしない）
+    """
+    def __init__(self, paths, files=8, threads=4, max_mb=256, max_file_mb=64):
+        self.depth = max(1, files)
+        self.max_bytes = max_mb * 1024 * 1024
+        self.max_file_bytes = max_file_mb * 1024 * 1024
+        self.buffered = 0
+        self.peak = 0
+        self.hits = 0
+        self.misses = 0
+        self.bytes_read = 0
+        self._order = deque(dict.fromkeys(paths))
+        self._futures = {}
+        self._skipped = set() # 先読みの前に要求され、呼び出し側が直接開いたファイル
+        self._tickets = itertools.count()
+        self._serving = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=max(1, threads), thread_name_prefix="read-ahead")
+        self._fill()
+
+    def _fill(self):
+        with self._cond:
+            while not self._closed and self._order and len(self._futures) < self.depth:
+                path = self._order.popleft()
+                if path in self._skipped:
+                    self._skipped.discard(path)
+                    continue
+                self._futures[path] = self._executor.submit(self._read, path, next(self._tickets))
+
+    def _read(self, path, ticket):
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            size = None
+        wanted = size is not None and size <= self.max_file_bytes
+        with self._cond:
+            # 上限の待ちは登録順に行う（後のファイルが先に枠を取り、先のファイルが読めなくなるのを防ぐ）
+            while not self._closed and (
+                ticket != self._serving
+                or (wanted and self.buffered and self.buffered + size > self.max_bytes)
+            ):
+                self._cond.wait()
+            if self._closed:
+                return None
+            self._serving += 1
+            if wanted:
+                self.buffered += size
+                self.peak = max(self.peak, self.buffered)
+            self._cond.notify_all()
+        if not wanted:
+            return None
+
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            data = None
+        with self._cond:
+            self.buffered += (len(data) if data is not None else 0) - size
+            self._cond.notify_all()
+        return data
+
+    def take(self, path):
+        """先読み済みの内容を返す。先読みしていない・できなかった場合は None（呼び出し側でファイルから開く）"""
+        with self._cond:
+            future = self._futures.pop(path, None)
+            if future is None:
+                # 後で読み込んでも受け取られず、バッファと先読みの枠を占め続けるため、先読みの予定から外す
+                self._skipped.add(path)
+        self._fill()
+        data = future.result() if future is not None else None
+        with self._cond:
+            if data is None:
+                self.misses += 1
+                return None
+            self.buffered -= len(data)
+            self.hits += 1
+            self.bytes_read += len(data)
+            self._cond.notify_all()
+        return data
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._futures.clear()
+            self._order.clear()
+            self._cond.notify_all()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def state(self):
+        with self._cond:
+            return {"hits": self.hits, "misses": self.misses, "bytes_read": self.bytes_read, "peak_buffered": self.peak}
@@ -0,0 +1,100 @@
+import sys
+import json
+import time
+import cProfile
+import threading
+
+# ワーカースレッドのプロファイリング（バグ報告に添付できる形式で保存する）
+#   cprofile: 呼び出し単位の決定的プロファイル (.prof, snakeviz / pstats で閲覧)
+#   sampling: 一定間隔でスタックを採取するサンプリングプロファイル (.speedscope.json, https://www.speedscope.app で閲覧)
+MODES = ("cprofile", "sampling")
+DEFAULT_INTERVAL_MS = 5
+
+
+class SamplingProfiler:
+    """指定したスレッドのスタックを別スレッドから定期的に採取する"""
+    def __init__(self, thread_ident, interval_ms=DEFAULT_INTERVAL_MS):
+        self.thread_ident = thread_ident
+        self.interval = interval_ms / 1000.0
+        self.frames = []
+        self._frame_index = {}
+        self.samples = []
+        self.weights = []
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _frame_id(self, code, lineno):
+        key = (code.co_name, code.co_filename, code.co_firstlineno)
+        idx = self._frame_index.get(key)
+        if idx is None:
+            idx = self._frame_index[key] = len(self.frames)
+            self.frames.append({"name": code.co_name, "file": code.co_filename, "line": code.co_firstlineno})
+        return idx
+
+    def _sample_loop(self):
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_ident)
+            now = time.perf_counter()
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self._frame_id(frame.f_code, frame.f_lineno))
+                frame = frame.f_back
+            stack.reverse()
+            self.samples.append(stack)
+            self.weights.append(now - last)
+            last = now
+
+    def start(self):
+        self._thread = threading.Thread(target=self._sample_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def write_speedscope(self, path, name="Namecle"):
+        total = sum(self.weights)
+        data = {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": self.frames},
+            "profiles": [{
+                "type": "sampled", "name": name, "unit": "seconds",
+                "startValue": 0, "endValue": total,
+                "samples": self.samples, "weights": self.weights,
+            }],
+            "exporter": "namecle_profiler",
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+
+
+def run_profiled(func, base_path, mode="cprofile", interval_ms=DEFAULT_INTERVAL_MS):
+    """
+    現在のスレッドで func() をプロファイルしながら実行し、結果を base_path + 拡張子 に保存する
+    func の例外はそのまま送出する（プロファイルは保存してから）。戻り値は保存したパス
+    """
+    if mode not in MODES:
+        raise ValueError(f"不明なプロファイルモード: {mode}")
+
+    if mode == "cprofile":
+        path = base_path + ".prof"
+        profiler = cProfile.Profile()
+        try:
+            profiler.runcall(func)
+        finally:
+            profiler.dump_stats(path)
+        return path
+
+    path = base_path + ".speedscope.json"
+    sampler = SamplingProfiler(threading.get_ident(), interval_ms)
+    sampler.start()
+    try:
+        func()
+    finally:
+        sampler.stop()
+        sampler.write_speedscope(path, name="RenameWorker")
+    return path
@@ -0,0 +1,183 @@
+import time
+import threading
+from email.utils import parsedate_to_datetime
+
+# API プロバイダごとの同時実行数の自動調整（AIMD）
+#   成功が続けば同時実行数を少しずつ増やし（加算増加）、
+#   429/503 やレイテンシの悪化を検知したら半分に減らす（乗算減少）
+THROTTLE_STATUSES = (429, 503)
+DEFAULT_RETRY_AFTER_SEC = 5.0
+MAX_RETRY_AFTER_SEC = 120.0
+
+
+def parse_retry_after(value):
+    """Retry-After ヘッダ（秒数または HTTP 日付）を秒に変換する"""
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+class _Slot:
+    __slots__ = ("limiter", "status", "latency", "retry_after")
+
+    def __init__(self, limiter):
+        self.limiter = limiter
+        self.status = None
+        self.latency = None
+        self.retry_after = None
+
+    def done(self, status, latency=None, retry_after=None):
+        """応答を記録する（スロット解放時に同時実行数の調整に使う）"""
+        self.status, self.latency, self.retry_after = status, latency, retry_after
+
+    def __enter__(self):
+        self.limiter.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.limiter.release(self.status, self.latency, self.retry_after)
+        return False
+
+
+class AdaptiveLimiter:
+    def __init__(self, name, initial=1, min_limit=1, max_limit=4, backoff=0.5, latency_factor=2.0):
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max(min_limit, max_limit)
+        self.limit = float(min(max(initial, min_limit), self.max_limit))
+        self.backoff = backoff
+        self.latency_factor = latency_factor
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.min_latency = None
+        self.avg_latency = None
+        self.throttled = 0
+        self.requests = 0
+        self.peak = self.limit
+        self.wait_sec = 0.0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    def slot(self):
+        """with limiter.slot() as slot: ...; slot.done(status, latency, retry_after)"""
+        return _Slot(self)
+
+    def acquire(self):
+        start = time.monotonic()
+        with self._cond:
+            while True:
+                wait = self.blocked_until - time.monotonic()
+                if wait > 0:
+                    self._cond.wait(wait)
+                elif self.in_flight < int(self.limit):
+                    break
+                else:
+                    self._cond.wait()
+            self.in_flight += 1
+            self.requests += 1
+            self.wait_sec += time.monotonic() - start
+
+    def _decrease(self, now):
+        # 同じ混雑に対する応答で何度も減らさないよう、直近の平均応答時間に 1 回までとする
+        if now - self._last_decrease < (self.avg_latency or 0.0):
+            return
+        self.limit = max(float(self.min_limit), self.limit * self.backoff)
+        self._last_decrease = now
+
+    def release(self, status=None, latency=None, retry_after=None):
+        with self._cond:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if status in THROTTLE_STATUSES:
+                self.throttled += 1
+                self._decrease(now)
+                delay = parse_retry_after(retry_after)
+                delay = DEFAULT_RETRY_AFTER_SEC if delay is None else min(delay, MAX_RETRY_AFTER_SEC)
+                self.blocked_until = max(self.blocked_until, now + delay)
+            elif status is not None and status < 500 and latency is not None:
+                self.min_latency = latency if self.min_latency is None else min(self.min_latency, latency)
+                self.avg_latency = latency if self.avg_latency is None else self.avg_latency * 0.8 + latency * 0.2
+                if self.avg_latency > self.latency_factor * self.min_latency:
+                    self._decrease(now)
+                elif self.limit < self.max_limit:
+                    # 同時実行数ぶんの成功で +1
+                    self.limit = min(float(self.max_limit), self.limit + 1.0 / self.limit)
+                    self.peak = max(self.peak, self.limit)
+            self._cond.notify_all()
+
+    def reset_stats(self):
+        """統計だけを初期化する（学習した同時実行数は次のバッチに引き継ぐ）"""
+        with self._cond:
+            self.requests = self.throttled = 0
+            self.wait_sec = 0.0
+            self.peak = self.limit
+
+    def state(self):
+        with self._cond:
+            return {
+                "limit": int(self.limit), "peak": int(self.peak), "max": self.max_limit,
+                "requests": self.requests, "throttled": self.throttled,
+                "avg_latency_ms": round((self.avg_latency or 0.0) * 1000, 1),
+                "wait_sec": round(self.wait_sec, 2),
+            }
+
+
+class KeyRing:
+    """
+    複数の API キーを、キーごとの上限レートを守りながら順番に使う
+    429 を受けたキーは Retry-After の間休ませ、401/403 のキーは以後使わない
+    """
+    def __init__(self, keys, rate_per_sec=1.0):
+        self.interval = 1.0 / rate_per_sec if rate_per_sec else 0.0
+        self._keys = [
+            {"key": k, "next": 0.0, "blocked_until": 0.0, "requests": 0, "throttled": 0, "invalid": False}
+            for k in dict.fromkeys(keys or []) if k
+        ]
+        self._cond = threading.Condition()
+
+    def __bool__(self):
+        return bool(self._keys)
+
+    def acquire(self):
+        """使えるキーを返す（次に使えるまで待つ）。有効なキーが無ければ None"""
+        with self._cond:
+            while True:
+                usable = [k for k in self._keys if not k["invalid"]]
+                if not usable:
+                    return None
+                entry = min(usable, key=lambda k: max(k["next"], k["blocked_until"]))
+                now = time.monotonic()
+                ready = max(entry["next"], entry["blocked_until"])
+                if ready <= now:
+                    entry["next"] = now + self.interval
+                    entry["requests"] += 1
+                    return entry["key"]
+                self._cond.wait(ready - now)
+
+    def release(self, key, status, retry_after=None):
+        with self._cond:
+            for entry in self._keys:
+                if entry["key"] != key:
+                    continue
+                if status in THROTTLE_STATUSES:
+                    entry["throttled"] += 1
+                    delay = parse_retry_after(retry_after)
+                    delay = DEFAULT_RETRY_AFTER_SEC if delay is None else min(delay, MAX_RETRY_AFTER_SEC)
+                    entry["blocked_until"] = time.monotonic() + delay
+                elif status in (401, 403):
+                    entry["invalid"] = True
+            self._cond.notify_all()
+
+    def state(self):
+        with self._cond:
+            return [
+                {"key": k["key"][:4] + "…", "requests": k["requests"], "throttled": k["throttled"], "invalid": k["invalid"]}
+                for k in self._keys
+            ]
@@ -0,0 +1,254 @@
+import os
+import sys
+import json
+import time
+
+from namecle_cache import file_fingerprint
+
+# リネーム計画（ディレクトリ一覧のスナップショットに対して衝突のない名前を決める）
+# 実行したリネームはジャーナル（JSONL）に記録し、バッチ単位で元に戻せるようにする
+
+
+def _rename_no_replace(src, dst):
+    """既存ファイルを上書きせずにリネームする。既に存在する場合は FileExistsError"""
+    if sys.platform == "win32":
+        os.rename(src, dst)
+        return
+    try:
+        os.link(src, dst)
+    except FileExistsError:
+        raise
+    except OSError:
+        # ハードリンク非対応のファイルシステム（SMB/FAT 等）
+        if os.path.lexists(dst):
+            raise FileExistsError(dst)
+        os.rename(src, dst)
+        return
+    os.unlink(src)
+
+
+def new_journal_path(undo_dir):
+    """
+    新しいジャーナルのパスを確保して返す（同じ秒に始めたバッチとも別のファイルにする）
+    名前は "日時-連番.jsonl" で、並べ替えると実行順になる
+    """
+    os.makedirs(undo_dir, exist_ok=True)
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    for n in range(1000):
+        path = os.path.join(undo_dir, f"{stamp}-{n:03d}.jsonl")
+        if os.path.exists(path + ".undone"):
+            continue
+        try:
+            os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return path
+        except FileExistsError:
+            continue
+    raise FileExistsError(f"ジャーナルを作成できません: {undo_dir}")
+
+
+class RenamePlan:
+    def __init__(self, manifest_path=None, fingerprint=False):
+        """
+        fingerprint: 計画に指紋が無いファイルも、リネーム前に内容の指紋を計算してジャーナルに記録する
+        （取り消し時の --verify 用。ファイルの先頭・末尾を読むため、ネットワークドライブでは遅くなる）
+        """
+        self.entries = []
+        self.manifest_path = manifest_path
+        self.fingerprint = fingerprint
+        self._listings = {}
+
+    def _names(self, dir_name, refresh=False):
+        key = os.path.normcase(os.path.abspath(dir_name))
+        names = self._listings.get(key)
+        if names is None or refresh:
+            try:
+                names = {os.path.normcase(n) for n in os.listdir(dir_name or ".")}
+            except OSError:
+                names = set()
+            # 計画済みの名前は一覧に無くても確保しておく
+            for e in self.entries:
+                if os.path.normcase(os.path.abspath(os.path.dirname(e["dst"]))) == key:
+                    names.add(os.path.normcase(os.path.basename(e["dst"])))
+            self._listings[key] = names
+        return names
+
+    def _resolve(self, src, new_filename, refresh=False):
+        dir_name = os.path.dirname(src)
+        names = self._names(dir_name, refresh)
+        src_name = os.path.normcase(os.path.basename(src))
+        base, ext = os.path.splitext(new_filename)
+        candidate = new_filename
+        counter = 0
+        while os.path.normcase(candidate) in names and os.path.normcase(candidate) != src_name:
+            counter += 1
+            candidate = f"{base} ({counter}){ext}"
+        if os.path.normcase(candidate) != src_name:
+            # 元の名前はリネーム後に空くため、後続のファイルが使えるようにする（実行順が前後した場合は apply_entry で取り直す）
+            names.discard(src_name)
+        names.add(os.path.normcase(candidate))
+        return os.path.join(dir_name, candidate)
+
+    def add(self, src, new_filename, info=None, fingerprint=None):
+        """
+        変更後の名前を計画に追加する（ファイルシステムへの問い合わせは最初の一覧取得のみ）
+        内容の指紋が既に分かっていれば fingerprint に渡す（ジャーナルに記録される）
+        """
+        entry = {
+            "src": src, "dst": self._resolve(src, new_filename), "target": new_filename,
+            "info": info, "status": "planned", "fp": fingerprint
+        }
+        self.entries.append(entry)
+        return entry
+
+    def apply_entry(self, entry):
+        """計画を1件実行する。失敗時は例外をそのまま送出する"""
+        src, dst = entry["src"], entry["dst"]
+        if os.path.normpath(src) == os.path.normpath(dst):
+            entry["status"] = "unchanged"
+            return entry
+        fingerprint = entry.get("fp")
+        try:
+            size = os.path.getsize(src)
+            if fingerprint is None and self.fingerprint:
+                fingerprint = file_fingerprint(src)
+        except OSError:
+            size = None
+        try:
+            _rename_no_replace(src, dst)
+        except FileExistsError:
+            # スナップショット取得後に同名ファイルが作られた場合は一覧を取り直す
+            entry["dst"] = dst = self._resolve(src, entry["target"], refresh=True)
+            _rename_no_replace(src, dst)
+        entry["status"] = "done"
+        entry["fp"] = fingerprint
+        self._record({"src": entry["src"], "dst": dst, "size": size, "fp": fingerprint})
+        return entry
+
+    def _record(self, record):
+        if not self.manifest_path:
+            return
+        with open(self.manifest_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def pending(self):
+        return [e for e in self.entries if e["status"] == "planned"]
+
+
+def read_journal(journal_path):
+    records = []
+    with open(journal_path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+    return records
+
+
+def list_journals(undo_dir):
+    """未取り消しのジャーナルを新しい順に返す"""
+    if not os.path.isdir(undo_dir):
+        return []
+    names = sorted((n for n in os.listdir(undo_dir) if n.endswith(".jsonl")), reverse=True)
+    return [os.path.join(undo_dir, n) for n in names if os.path.getsize(os.path.join(undo_dir, n)) > 0]
+
+
+def _scan_dir(dir_name):
+    """ディレクトリを1回だけ走査し、{正規化した名前: サイズ} を返す"""
+    entries = {}
+    try:
+        with os.scandir(dir_name or ".") as it:
+            for e in it:
+                try:
+                    entries[os.path.normcase(e.name)] = e.stat().st_size if e.is_file() else None
+                except OSError:
+                    entries[os.path.normcase(e.name)] = None
+    except OSError:
+        pass
+    return entries
+
+
+def rollback_journal(journal_path, logger=print, verify_content=False):
+    """
+    ジャーナルに記録されたリネームを逆順に取り消す
+    ディレクトリごとに一覧を1回だけ取得して存在確認を行い、ネットワーク越しの往復を減らす
+    戻せなかった分はジャーナルに残し、全件戻せた場合はジャーナルを .undone にする
+    """
+    records = read_journal(journal_path)
+    listings = {}
+
+    def listing(path):
+        key = os.path.normcase(os.path.abspath(os.path.dirname(path)))
+        if key not in listings:
+            listings[key] = _scan_dir(os.path.dirname(path))
+        return listings[key]
+
+    restored, remaining = 0, []
+    for rec in reversed(records):
+        src, dst = rec["src"], rec["dst"]
+        dst_listing, src_listing = listing(dst), listing(src)
+        dst_name, src_name = os.path.normcase(os.path.basename(dst)), os.path.normcase(os.path.basename(src))
+
+        if dst_name not in dst_listing:
+            logger(f"[取り消し] 見つかりません: {dst}")
+            remaining.append(rec)
+            continue
+        if src_name in src_listing:
+            logger(f"[取り消し] 元の名前が既に使われています: {src}")
+            remaining.append(rec)
+            continue
+        if rec.get("size") is not None and dst_listing[dst_name] not in (None, rec["size"]):
+            logger(f"[取り消し] 内容が変更されています: {dst}")
+            remaining.append(rec)
+            continue
+        if verify_content and rec.get("fp"):
+            try:
+                if file_fingerprint(dst) != rec["fp"]:
+                    logger(f"[取り消し] 内容が変更されています: {dst}")
+                    remaining.append(rec)
+                    continue
+            except OSError:
+                pass
+
+        try:
+            _rename_no_replace(dst, src)
+        except OSError as e:
+            logger(f"[取り消し] 失敗: {dst} ({e})")
+            remaining.append(rec)
+            continue
+        del dst_listing[dst_name]
+        src_listing[src_name] = rec.get("size")
+        restored += 1
+
+    if remaining:
+        tmp_path = journal_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for rec in reversed(remaining):
+                f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+        os.replace(tmp_path, journal_path)
+    else:
+        os.replace(journal_path, journal_path + ".undone")
+    logger(f"[取り消し] {restored} 件を元に戻しました。残り {len(remaining)} 件。")
+    return restored, len(remaining)
+
+
+def main(argv):
+    if not argv or argv[0] != "undo":
+        print("使い方:")
+        print("  python namecle_rename.py undo <ジャーナル.jsonl | undoディレクトリ> [--verify]")
+        return 1
+    target = argv[1] if len(argv) > 1 else "."
+    if os.path.isdir(target):
+        journals = list_journals(target)
+        if not journals:
+            print("取り消せるジャーナルがありません。")
+            return 1
+        target = journals[0]
+    rollback_journal(target, verify_content="--verify" in argv)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,29 @@
+import sys
+
+# PDF 解析用の子プロセスの入口
+# GUI 本体（PyQt5 など）を読み込まずに起動し、親プロセスから受け取ったパイプで namecle_pdf の解析を行う
+# 開発時: python namecle_sandbox.py <接続情報...> / exe 版: Namecle_Windows.exe --namecle-sandbox <接続情報...>
+ARG = "--namecle-sandbox"
+
+
+def _connect(argv):
+    """親プロセスから引き継いだパイプを Connection にする"""
+    if sys.platform == "win32":
+        from multiprocessing.connection import PipeConnection
+        from multiprocessing.reduction import steal_handle
+        parent_pid, handle = int(argv[0]), int(argv[1])
+        return PipeConnection(steal_handle(parent_pid, handle)), argv[2:]
+    from multiprocessing.connection import Connection
+    return Connection(int(argv[0])), argv[1:]
+
+
+def main(argv):
+    conn, rest = _connect(argv)
+    memory_mb = int(rest[0]) if rest else 0
+    from namecle_pdf import _sandbox_main
+    _sandbox_main(conn, memory_mb)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,105 @@
+import os
+import re
+
+# DOI・発行年・著者をまとめて1回の走査で抽出するスキャナ（Windows版/Linux版 共通）
+DOI_REGEX = r'\b(?:https?://doi\.org/|doi[:\s]*)?(?P<doi>10\.\d{4,9}/[-._;()/:A-Z0-9]+)\b'
+YEAR_REGEX = r'(?P<year>20\d{2}|19\d{2})'
+AUTHOR_REGEX = r'(?P<author>[A-Z]\.[A-Z]?\.?\s?[A-Z][a-z]+|[A-Z][a-z]+\s[A-Z][a-z]+)'
+
+# arXiv ID（新形式 2301.01234v2 と旧形式 hep-th/9901001）。本文中は "arXiv:" が付いたものだけを拾う
+ARXIV_ID_REGEX = r'(?P<arxiv>\d{2}(?:0[1-9]|1[0-2])\.\d{4,5}|[a-z][a-z-]+(?:\.[A-Z]{2})?/\d{7})(?:v\d+)?'
+
+DOI_PATTERN = re.compile(DOI_REGEX, re.IGNORECASE)
+ARXIV_PATTERN = re.compile(r'\barXiv\s*:\s*' + ARXIV_ID_REGEX, re.IGNORECASE)
+ARXIV_FILENAME_PATTERN = re.compile(r'(?:^|[^\d.])(?:arxiv[_\-.: ]*)?(?P<arxiv>\d{2}(?:0[1-9]|1[0-2])\.\d{4,5})(?:v\d+)?(?![\d])', re.IGNORECASE)
+SCAN_PATTERN = re.compile("|".join([DOI_REGEX, YEAR_REGEX, AUTHOR_REGEX]), re.IGNORECASE)
+
+MAX_SCAN_CHARS = 200000 # 走査する最大文字数
+
+
+def find_doi(text):
+    if not text:
+        return None
+    m = DOI_PATTERN.search(text, 0, MAX_SCAN_CHARS)
+    return m.group("doi") if m else None
+
+
+def find_arxiv_id(text):
+    """本文中の "arXiv:2301.01234v2" などから、バージョンを除いた arXiv ID を返す"""
+    if not text:
+        return None
+    m = ARXIV_PATTERN.search(text, 0, MAX_SCAN_CHARS)
+    return m.group("arxiv") if m else None
+
+
+def arxiv_id_from_filename(path):
+    """ファイル名（例: 2301.01234v2.pdf, arXiv_2301.01234.pdf）から新形式の arXiv ID を返す"""
+    name = os.path.splitext(os.path.basename(path))[0]
+    m = ARXIV_FILENAME_PATTERN.search(name)
+    return m.group("arxiv") if m else None
+
+
+# ファイル名に含まれる識別子（出版社のダウンロード名: 10.1109_TPAMI.2020.1234.pdf, s41586-023-06291-2.pdf, 1-s2.0-S0893608019301234-main.pdf）
+FILENAME_DOI_PATTERN = re.compile(r'^(?:doi[_\-: ]*)?(?P<prefix>10\.\d{4,9})(?:[_/+]|%2F)(?P<suffix>\S+)$', re.IGNORECASE)
+SPRINGER_ID_PATTERN = re.compile(r'(?:^|[^a-z0-9])(?P<id>s(?P<journal>\d{5})-\d{3}-\d{4,5}-[0-9a-z])(?:$|[^a-z0-9])', re.IGNORECASE)
+PII_PATTERN = re.compile(r'(?:^|[^a-z0-9])(?:1-s2\.0-)?(?P<pii>S\d{7}[\dX]\d{7}[\dX])(?:$|[^a-z0-9])', re.IGNORECASE)
+_COPY_SUFFIX = re.compile(r'\s*(?:\(\d+\)|-\s*(?:copy|コピー))$', re.IGNORECASE)
+
+
+def _springer_doi(article_id, journal):
+    """Springer Nature の論文番号から DOI を組み立てる（s41xxx: Nature 系, s12/s13/s40xxx: BMC 系, それ以外: Springer）"""
+    if journal.startswith("41"):
+        return f"10.1038/{article_id}"
+    if journal[:2] in ("12", "13", "40"):
+        return f"10.1186/{article_id}"
+    return f"10.1007/{article_id}"
+
+
+def identifiers_from_filename(path):
+    """
+    ファイル名から識別子の候補を [(種類, 値), ...] で返す（種類は "doi" / "pii" / "arxiv"）
+    PDF の中身を読まずに書誌情報を引くための高速経路で使う
+    """
+    name = _COPY_SUFFIX.sub("", os.path.splitext(os.path.basename(path))[0])
+    candidates = []
+    m = FILENAME_DOI_PATTERN.match(name)
+    if m:
+        candidates.append(("doi", f"{m.group('prefix')}/{m.group('suffix')}"))
+    m = SPRINGER_ID_PATTERN.search(name)
+    if m:
+        candidates.append(("doi", _springer_doi(m.group("id").lower(), m.group("journal"))))
+    m = PII_PATTERN.search(name)
+    if m:
+        candidates.append(("pii", m.group("pii").upper()))
+    if not candidates:
+        m = ARXIV_FILENAME_PATTERN.search(name)
+        if m:
+            candidates.append(("arxiv", m.group("arxiv")))
+    return candidates
+
+
+def scan_text(text, max_authors=5, max_chars=MAX_SCAN_CHARS):
+    """
+    テキストを先頭から1回だけ走査し、(DOI, 最初の発行年, 著者候補のリスト) を返す
+    DOI・発行年・著者候補が揃った時点で走査を打ち切る
+    """
+    doi, year, authors = None, None, []
+    if not text:
+        return doi, year, authors
+
+    for m in SCAN_PATTERN.finditer(text, 0, max_chars):
+        kind = m.lastgroup
+        if kind == "doi":
+            if doi is None:
+                doi = m.group("doi")
+        elif kind == "year":
+            if year is None:
+                year = m.group("year")
+        elif len(authors) < max_authors:
+            authors.append(m.group("author"))
+
+        if doi and year and len(authors) >= max_authors:
+            break
+
+    # 重複を除いた順序付きの著者リスト
+    return doi, year, list(dict.fromkeys(authors))
@@ -0,0 +1,182 @@
+import csv
+import json
+import time
+import threading
+
+# 処理段階ごとの計測（ファイル単位のタイミングを集計し、実行後にサマリを出す）
+
+_active = None
+_local = threading.local()
+
+
+class _NullSpan(dict):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def __setitem__(self, key, value):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span(dict):
+    __slots__ = ("profile", "name", "file", "start")
+
+    def __init__(self, profile, name, file, attrs):
+        super().__init__(attrs)
+        self.profile = profile
+        self.name = name
+        self.file = file
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.start
+        if exc_type is not None:
+            self["error"] = exc_type.__name__
+        self.profile.add(self.name, duration, self.file, self.start, dict(self))
+        return False
+
+
+def _percentile(values, q):
+    if not values:
+        return 0.0
+    k = (len(values) - 1) * q
+    lo = int(k)
+    hi = min(lo + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+
+class RunProfile:
+    def __init__(self):
+        self.records = []
+        self.counters = {}
+        self.gauges = {}
+        self.started = time.perf_counter()
+        self.finished = None
+        self._lock = threading.Lock()
+
+    def add(self, name, duration, file=None, start=None, attrs=None):
+        rec = {
+            "file": file, "stage": name,
+            "start": (start if start is not None else time.perf_counter() - duration) - self.started,
+            "duration": duration,
+        }
+        if attrs:
+            rec.update(attrs)
+        with self._lock:
+            self.records.append(rec)
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def finish(self):
+        self.finished = time.perf_counter()
+
+    def summary(self):
+        stages = {}
+        for rec in self.records:
+            key = rec["stage"]
+            if rec.get("provider"):
+                key = f"{key}:{rec['provider']}"
+            stages.setdefault(key, []).append(rec["duration"])
+
+        result = {"wall_sec": (self.finished or time.perf_counter()) - self.started, "stages": {}, "hit_rates": {}}
+        for key, durations in sorted(stages.items()):
+            durations.sort()
+            result["stages"][key] = {
+                "count": len(durations),
+                "total_sec": sum(durations),
+                "p50_ms": _percentile(durations, 0.50) * 1000,
+                "p95_ms": _percentile(durations, 0.95) * 1000,
+                "max_ms": durations[-1] * 1000,
+            }
+        for name, hits in self.counters.items():
+            if name.endswith(".hit"):
+                base = name[:-len(".hit")]
+                total = hits + self.counters.get(base + ".miss", 0)
+                result["hit_rates"][base] = hits / total if total else 0.0
+        result["counters"] = dict(self.counters)
+        result["gauges"] = dict(self.gauges)
+        return result
+
+    def format_summary(self):
+        s = self.summary()
+        lines = [f"=== 処理時間サマリ (合計 {s['wall_sec']:.1f} 秒) ==="]
+        lines.append(f"{'段階':<24}{'回数':>6}{'合計(秒)':>10}{'p50(ms)':>10}{'p95(ms)':>10}")
+        for key, st in s["stages"].items():
+            lines.append(f"{key:<24}{st['count']:>6}{st['total_sec']:>10.2f}{st['p50_ms']:>10.1f}{st['p95_ms']:>10.1f}")
+        for name, rate in s["hit_rates"].items():
+            lines.append(f"{name} ヒット率: {rate * 100:.1f}%")
+        for name, value in s["gauges"].items():
+            lines.append(f"{name}: {value}")
+        return "\n".join(lines)
+
+    def export_json(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"summary": self.summary(), "records": self.records}, f, ensure_ascii=False, indent=2)
+
+    def export_csv(self, path):
+        keys = ["file", "stage", "start", "duration"]
+        for rec in self.records:
+            for k in rec:
+                if k not in keys:
+                    keys.append(k)
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=keys)
+            writer.writeheader()
+            writer.writerows(self.records)
+
+    def export_chrome_trace(self, path):
+        """Chrome トレース形式 (chrome://tracing / Perfetto で閲覧) で保存する"""
+        events = []
+        for rec in self.records:
+            args = {k: v for k, v in rec.items() if k not in ("stage", "start", "duration")}
+            events.append({
+                "name": rec["stage"], "cat": rec.get("provider") or "pipeline", "ph": "X",
+                "ts": rec["start"] * 1e6, "dur": rec["duration"] * 1e6,
+                "pid": 1, "tid": 1, "args": args,
+            })
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, ensure_ascii=False)
+
+
+def activate(profile):
+    global _active
+    _active = profile
+
+
+def active():
+    return _active
+
+
+def set_current_file(path):
+    """以降このスレッドで記録される段階を、指定したファイルに紐付ける"""
+    _local.file = path
+
+
+def stage(name, **attrs):
+    """with stage("api", provider="crossref") as span: ... の形で計測する（計測無効時は何もしない）"""
+    profile = _active
+    if profile is None:
+        return _NULL_SPAN
+    return _Span(profile, name, getattr(_local, "file", None), attrs)
+
+
+def record(name, duration, **attrs):
+    profile = _active
+    if profile is not None:
+        profile.add(name, duration, getattr(_local, "file", None), None, attrs)
+
+
+def count(name, n=1):
+    profile = _active
+    if profile is not None:
+        profile.count(name, n)
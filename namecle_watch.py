@@ -0,0 +1,270 @@
+import os
+import sys
+import time
+import queue
+import select
+import struct
+import threading
+
+from namecle_cache import TextCache, file_fingerprint
+from namecle_metrics import REGISTRY, MetricsServer, DEFAULT_PORT as DEFAULT_METRICS_PORT, parse_port
+
+# ホットフォルダ監視（Linux は inotify、それ以外はポーリング）
+DEBOUNCE_SEC = 3.0 # サイズが変化しなくなってから処理するまでの待ち時間
+POLL_INTERVAL_SEC = 5.0
+QUEUE_SIZE = 256 # 処理待ちキューの上限
+MAX_PENDING = 4096 # 書き込み完了待ちとして追跡するファイル数の上限
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+EVENT_HEADER = struct.Struct("iIII")
+
+WATCH_FILES = REGISTRY.counter("namecle_watch_files_total", "監視モードで処理したファイル数", ["result"])
+WATCH_SECONDS = REGISTRY.histogram("namecle_watch_process_seconds", "監視モードでの1ファイルの処理時間")
+QUEUE_DEPTH = REGISTRY.gauge("namecle_queue_depth", "処理待ちのファイル数")
+PENDING_FILES = REGISTRY.gauge("namecle_watch_pending_files", "書き込み完了待ちのファイル数")
+
+
+def _init_inotify(folder):
+    """inotify の fd を返す。使えない環境では None"""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        import ctypes
+        import ctypes.util
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            return None
+        if libc.inotify_add_watch(fd, os.fsencode(folder), IN_CLOSE_WRITE | IN_MOVED_TO) < 0:
+            os.close(fd)
+            return None
+        return fd
+    except Exception:
+        return None
+
+
+class FolderWatcher:
+    """
+    フォルダに置かれた PDF を検出し、書き込み完了を待ってから handler(path) を呼ぶ
+    処理済みのファイルは内容の指紋で記録し、リネーム後の再検出では処理しない
+    """
+    def __init__(self, folder, handler, seen_db_path=None, logger=print,
+                 debounce_sec=DEBOUNCE_SEC, poll_interval=POLL_INTERVAL_SEC,
+                 queue_size=QUEUE_SIZE, force_polling=False, skip_existing=False):
+        self.folder = os.path.abspath(folder)
+        self.handler = handler
+        self.logger = logger
+        self.debounce_sec = debounce_sec
+        self.poll_interval = poll_interval
+        self.force_polling = force_polling
+        self.skip_existing = skip_existing
+        self.seen = TextCache(seen_db_path) if seen_db_path else None
+        self._failed = {} # 処理に失敗したファイル {パス: (サイズ, 更新日時)}。置き換えられたファイルは再度処理する
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._queued = set()
+        self._pending = {}
+        self._snapshot = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        QUEUE_DEPTH.set_function(self._queue.qsize)
+        PENDING_FILES.set_function(lambda: len(self._pending))
+
+    def stop(self):
+        self._stop.set()
+
+    def _touch(self, path):
+        if not path.lower().endswith(".pdf"):
+            return
+        with self._lock:
+            if path in self._queued:
+                return
+            if path not in self._pending and len(self._pending) >= MAX_PENDING:
+                return
+            self._pending[path] = [time.monotonic(), -1]
+
+    def _promote_ready(self):
+        """サイズが安定したファイルを処理待ちキューへ移す"""
+        now = time.monotonic()
+        with self._lock:
+            for path, state in list(self._pending.items()):
+                try:
+                    size = os.path.getsize(path)
+                except OSError:
+                    del self._pending[path]
+                    continue
+                if size != state[1]:
+                    state[0], state[1] = now, size
+                    continue
+                if now - state[0] < self.debounce_sec:
+                    continue
+                try:
+                    self._queue.put_nowait(path)
+                except queue.Full:
+                    break
+                del self._pending[path]
+                self._queued.add(path)
+
+    def _scan(self, initial=False):
+        """フォルダを走査し、新規または変化したファイルを検出する（ポーリング用・再同期用）"""
+        current = {}
+        try:
+            with os.scandir(self.folder) as it:
+                for e in it:
+                    if e.is_file() and e.name.lower().endswith(".pdf"):
+                        st = e.stat()
+                        current[e.path] = (st.st_size, st.st_mtime)
+        except OSError as e:
+            self.logger(f"[監視] フォルダを読み込めません: {e}")
+            return
+        if not (initial and self.skip_existing):
+            for path, sig in current.items():
+                if self._snapshot.get(path) != sig:
+                    self._touch(path)
+        self._snapshot = current
+
+    @staticmethod
+    def _signature(path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_size, st.st_mtime
+
+    def _process(self, path):
+        signature = self._signature(path)
+        if signature is None or self._failed.get(path) == signature:
+            return
+        try:
+            fingerprint = file_fingerprint(path)
+        except OSError:
+            return
+        if self.seen is not None and self.seen.get(fingerprint) is not None:
+            WATCH_FILES.labels("seen").inc()
+            return
+        with WATCH_SECONDS.time():
+            new_name = self.handler(path)
+        WATCH_FILES.labels("renamed" if new_name else "failed").inc()
+        if not new_name:
+            self._failed[path] = signature
+        elif self.seen is not None:
+            self.seen.put(fingerprint, new_name)
+
+    def _worker(self):
+        while not self._stop.is_set():
+            try:
+                path = self._queue.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            try:
+                self._process(path)
+            except Exception as e:
+                WATCH_FILES.labels("error").inc()
+                self.logger(f"[監視] 処理中にエラー: {path} ({e})")
+                self._failed[path] = self._signature(path)
+            finally:
+                with self._lock:
+                    self._queued.discard(path)
+
+    def _read_inotify(self, fd):
+        try:
+            data = os.read(fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            _, mask, _, name_len = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + name_len].rstrip(b"\0")
+            offset += name_len
+            if mask & IN_Q_OVERFLOW:
+                self._scan()
+            elif name:
+                self._touch(os.path.join(self.folder, os.fsdecode(name)))
+
+    def run(self):
+        worker = threading.Thread(target=self._worker, daemon=True)
+        worker.start()
+
+        fd = None if self.force_polling else _init_inotify(self.folder)
+        self.logger(f"[監視] 開始: {self.folder} ({'inotify' if fd is not None else 'ポーリング'})")
+        self._scan(initial=True)
+        last_scan = time.monotonic()
+        try:
+            while not self._stop.is_set():
+                # 追跡中のファイルが無ければ長めに待ち、アイドル時の CPU 使用を抑える
+                timeout = 1.0 if self._pending else self.poll_interval
+                if fd is not None:
+                    readable, _, _ = select.select([fd], [], [], timeout)
+                    if readable:
+                        self._read_inotify(fd)
+                else:
+                    self._stop.wait(timeout)
+                    if time.monotonic() - last_scan >= self.poll_interval:
+                        self._scan()
+                        last_scan = time.monotonic()
+                if self._pending:
+                    self._promote_ready()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._stop.set()
+            if fd is not None:
+                os.close(fd)
+            worker.join(5)
+            self.logger("[監視] 終了しました。")
+
+
+def main(argv):
+    args = [a for a in argv if not a.startswith("--")]
+    if len(args) != 1 or not os.path.isdir(args[0]):
+        print("使い方:")
+        print("  python namecle_watch.py <監視フォルダ> [--poll] [--skip-existing] [--metrics-port[=9464]]")
+        return 1
+
+    import Namecle_Linux
+
+    def log(msg):
+        print(f"{time.strftime('%Y-%m-%d %H:%M:%S')} {msg.strip()}", flush=True)
+
+    def handle(path):
+        new_name, _ = Namecle_Linux.process_file(path, log)
+        Namecle_Linux.LOOKUP_CACHE.flush()
+        return new_name
+
+    metrics_server = None
+    port = None
+    for arg in argv:
+        if arg == "--metrics-port":
+            port = DEFAULT_METRICS_PORT
+        elif arg.startswith("--metrics-port="):
+            port = parse_port(arg.split("=", 1)[1])
+            if port is None:
+                log(f"[監視] ポート番号が不正なため、メトリクスを公開しません: {arg}")
+    if port:
+        try:
+            metrics_server = MetricsServer(REGISTRY, port=port).start()
+            log(f"[監視] メトリクス: {metrics_server.url}")
+        except OSError as e:
+            log(f"[監視] メトリクスのエンドポイントを開始できません: {e}")
+
+    watcher = FolderWatcher(
+        args[0], handle,
+        seen_db_path=os.path.join(Namecle_Linux.APP_DATA_DIR, "watch_seen.db"),
+        logger=log,
+        force_polling="--poll" in argv,
+        skip_existing="--skip-existing" in argv
+    )
+    try:
+        watcher.run()
+    finally:
+        if metrics_server is not None:
+            metrics_server.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))